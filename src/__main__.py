@@ -1,39 +1,52 @@
+import time
+
+# the startup report times everything from here to the first frame
+started = time.perf_counter()
+
+import argparse
 import contextlib
 import sys
-import os
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from application import Application
-from enums import Direction, Tile
+from assets import assets
+from board import Board
+from camera import Camera
+from enums import Direction
+from game import Game, TICK_RATE
+from levels import list_levels, open_level
 from pacman import PacmanSprite
-from ghost import add_ghosts
+from render import Background, render_frame, render_sprites, repaint_tile
 
 with contextlib.redirect_stdout(None):
     import pygame
 
+startup: List[Tuple[str, float]] = []
 
-TB = List[List[Tile]]
 
+def mark(name: str) -> None:
+    startup.append((name, time.perf_counter()))
 
-def load(file: str) -> pygame.Surface:
-    path = "../assets/" + file + ".png"
-    return pygame.image.load(path)
 
+mark("imports")
 
-PACMAN_OPEN_RIGHT = load("pacman_open_right")
 
-BLANK = load("blank")
-COIN = load("coin")
-WALL = load("wall")
+def startup_report(first_frame: Optional[float]) -> List[str]:
+    lines = []
+    last = started
+    marks = startup + ([("first frame", first_frame)] if first_frame else [])
+    for name, at in marks:
+        lines.append("{0:<12} {1:8.1f}ms".format(name, (at - last) * 1000))
+        last = at
+    lines.append("{0:<12} {1:8.1f}ms".format("total", (last - started) * 1000))
+    return lines
 
 
-def open_board() -> str:
+def open_board() -> Tuple[str, Board]:
     board = str()
     try:
         board = input("What level do you want to play? ")
-        with open("../levels/" + board + ".board") as f:
-            board_data = f.read()
-            return board_data
+        return board, open_level(board)
     except FileNotFoundError:
         print("The board '" + board + "' does not exist!")
         return open_board()
@@ -41,61 +54,188 @@ def open_board() -> str:
         sys.exit(0)
 
 
-print(
-    "Possible boards are: " + ", ".join(b[:-6] for b in os.listdir("../levels/")),
-    end="\n\n",
+parser = argparse.ArgumentParser(prog="pacman")
+parser.add_argument(
+    "level",
+    nargs="?",
+    help="the level to play, either its name or the path to a .board or .level file "
+    "(asks which one if it's left out)",
+)
+parser.add_argument(
+    "--full-redraw",
+    action="store_true",
+    help="redraw and push the whole window every frame instead of only what changed",
+)
+parser.add_argument(
+    "--pathfinding",
+    nargs="?",
+    const="table",
+    choices=("bfs", "table"),
+    help="make the ghosts path find through the maze to their targets, either "
+    "by searching as they go (bfs) or with a table built once per level (table)",
+)
+parser.add_argument(
+    "--swarm",
+    type=int,
+    default=0,
+    metavar="N",
+    help="play against N ghosts, worked out all at once with numpy (which "
+    "needs installing) and only path finding with the table",
+)
+parser.add_argument(
+    "--autopilot",
+    action="store_true",
+    help="let pacman play himself, looking ahead from snapshots of the game",
+)
+parser.add_argument(
+    "--record",
+    metavar="FILE",
+    help="record the game into FILE on exit, to play back with replay.py",
+)
+parser.add_argument(
+    "--fixed-timestep",
+    action="store_true",
+    help="run the game at a constant rate whatever the frame rate, "
+    "drawing the sprites in between ticks",
+)
+
+
+def speed(value: str) -> float:
+    return 0.0 if value == "max" else float(value)
+
+
+parser.add_argument(
+    "--speed",
+    type=speed,
+    default=1.0,
+    help="how many times faster than normal to run the game, 'max' runs it as "
+    "fast as it'll go (both imply --fixed-timestep)",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="time every part of every frame, showing the frame times on screen "
+    "and printing a summary on exit",
 )
-board = open_board()
-app = Application(caption="PacMan", width=576, height=600, icon=PACMAN_OPEN_RIGHT)
-
-
-def parse_board(board: str) -> TB:
-    tiles_dict = {"-": Tile.WALL, "*": Tile.COIN, " ": Tile.BLANK}
-    res = []
-    for row in board.split("\n"):
-        line = []
-        for item in row:
-            line.append(tiles_dict[item])
-        res.append(line)
-    return res
-
-
-def render_board(board: TB) -> None:
-    for n_line, line in enumerate(board):
-        for n_item, item in enumerate(line):
-            img = WALL
-            if item == Tile.WALL:
-                img = WALL
-            elif item == Tile.COIN:
-                img = COIN
-            elif item == Tile.BLANK:
-                img = BLANK
-                # remember, don't "continue" here cause
-                # it speeds up when the is no coin
-            app.display.blit(img, (n_item * 24, n_line * 24 + 24))
+parser.add_argument(
+    "--trace",
+    metavar="FILE",
+    help="write the timings to FILE as chrome trace events on exit",
+)
+parser.add_argument(
+    "--startup-report",
+    action="store_true",
+    help="print how long each part of starting up took, up to the first frame",
+)
+args = parser.parse_args()
+
+if args.level is not None:
+    name = args.level
+    try:
+        level = open_level(name)
+    except FileNotFoundError:
+        sys.exit("The board '" + name + "' does not exist!")
+else:
+    print(
+        "Possible boards are: " + ", ".join(list_levels()),
+        end="\n\n",
+    )
+    name, level = open_board()
+if args.swarm:
+    from paths import check_swarm_paths
+
+    try:
+        check_swarm_paths(args.pathfinding, level)
+    except ValueError as error:
+        parser.error(str(error))
+mark("level")
+
+profiler = None
+if args.profile or args.trace:
+    from profiler import Profiler
+
+    profiler = Profiler()
+
+app = Application(
+    caption="PacMan",
+    # as much of the board as fits in the original window, the camera
+    # follows pacman round anything bigger
+    width=min(level.width * 24, 576),
+    height=min(level.height * 24 + 24, 600),
+    icon=assets["pacman_open_right"],
+    dirty_rects=not args.full_redraw,
+    profiler=profiler,
+    overlay=args.profile,
+)
+mark("window")
+
+pilot = None
+if args.autopilot:
+    from autopilot import Autopilot
+
+    # shallower than autopilot.py's defaults so deciding fits in a frame,
+    # it's about 7ms a decision on the classic board
+    pilot = Autopilot(rollouts=4, depth=24)
+
+recorder = None
 
 
 @app.on("start")
 def start(app) -> None:
-    app.board = parse_board(board)
+    global recorder
+    assets.convert()
+    mark("assets")
+    paths = None
+    if args.pathfinding is not None:
+        # building or loading the path table is the slowest part of
+        # starting, so none of it gets imported unless it's wanted
+        from paths import load_paths
+
+        paths = load_paths(args.pathfinding, level)
+    app.game = Game(level, paths, args.swarm)
+    app.game.profiler = app.profiler
+    if args.record:
+        from replay import Recorder
+
+        recorder = Recorder(app.game, name, args.pathfinding)
+    mark("game")
+    app.background = Background(app.game.board)
+    app.camera = Camera(app.width, app.height, level.width * 24, level.height * 24 + 24)
+    app.camera.follow(*app.game.get_sprite("pacman").position)
+
+    app.background.draw(app.display, app.camera)
+    render_sprites(app, 1.0)
+    mark("background")
 
-    app.display.fill((0, 0, 0))
-    render_board(app.board)
-    app.add_sprite(PacmanSprite(app), "pacman")
-    add_ghosts(app)
+
+@app.on("tilechange")
+def tilechange(app, pos: Tuple[int, int]) -> None:
+    repaint_tile(app, pos)
 
 
 @app.on("update")
 def update(app) -> None:
-    app.display.fill((0, 0, 0))
-    render_board(app.board)
-    for sprite in app.sprites:
-        app.sprites[sprite].update()
+    if pilot is not None:
+        direction = pilot.choose(app.game)
+        if direction is not None:
+            app.game.get_sprite("pacman").next_direction = direction
+    if recorder is not None:
+        recorder.step()
+    else:
+        app.game.step()
+    for pos in app.game.changed:
+        app.send("tilechange", pos)
+    app.game.changed.clear()
+
+
+@app.on("render")
+def render(app, alpha: float) -> None:
+    render_frame(app, alpha)
 
 
 @app.on("keydown")
 def keydown(app, event: pygame.event.EventType):
-    pacman: PacmanSprite = app.get_sprite("pacman")
+    pacman: PacmanSprite = app.game.get_sprite("pacman")
     if event.key == pygame.K_ESCAPE:
         app.exit(0)
 
@@ -110,4 +250,16 @@ def keydown(app, event: pygame.event.EventType):
         pacman.next_direction = direction
 
 
-app.run()
+if args.fixed_timestep or args.speed != 1:
+    app.run(tick_rate=TICK_RATE, speed=args.speed)
+else:
+    app.run()
+
+if recorder is not None:
+    recorder.save(args.record)
+if args.startup_report:
+    print("\n".join(startup_report(app.first_frame)))
+if app.profiler is not None:
+    print("\n".join(app.profiler.summary()))
+    if args.trace:
+        app.profiler.export(args.trace)
@@ -1,19 +1,30 @@
 from __future__ import annotations
 import contextlib
+import time
 import traceback
-from typing import Any, Callable, Dict, Optional, TYPE_CHECKING, TypeVar, Union, List
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+    List,
+)
 
 with contextlib.redirect_stdout(None):
     import pygame
 
 if TYPE_CHECKING:
-    from sprite import Sprite
+    from camera import Camera
+    from game import Game
+    from render import Background
 
-    T = TypeVar("T", bound=Sprite)
+from profiler import Profiler
 
-from enums import Tile
-
-TB = List[List[Tile]]
+CUSTOM_EVENTS = ("start", "update", "render", "tilechange")
 
 
 class EventNotFound(Exception):
@@ -22,9 +33,19 @@ class EventNotFound(Exception):
 
 class Application:
     def __init__(
-        self, *, caption: str, width: int, height: int, icon: pygame.Surface
+        self,
+        *,
+        caption: str,
+        width: int,
+        height: int,
+        icon: pygame.Surface,
+        dirty_rects: bool = False,
+        profiler: Optional[Profiler] = None,
+        overlay: bool = False
     ) -> None:
-        pygame.init()
+        # only the display, everything else (fonts, sound) gets started if
+        # and when it's used instead of slowing down every launch
+        pygame.display.init()
         self.width: int = width
         self.height: int = height
         self.caption: str = caption
@@ -34,31 +55,62 @@ class Application:
         pygame.display.set_caption(caption)
 
         self.events: Dict[Union[int, str], Callable] = dict()
-        self.sprites = dict()
 
         self.stopped: bool = False
         self.clock: pygame.time.Clock = pygame.time.Clock()
-        self.board: TB
+        self.game: Game
+        self.background: Background
+        self.camera: Camera
+
+        # with dirty_rects on only the areas that got drawn to this frame
+        # (dirty) and the areas that were drawn to last frame and have
+        # been restored since (stale) are pushed to the screen
+        self.dirty_rects: bool = dirty_rects
+        self.dirty: List[pygame.Rect] = []
+        self.stale: List[pygame.Rect] = []
+        # everything drawn over the background this frame, queued up by
+        # draw() so it can all go to the display in one blits call
+        self.draws: List[Tuple[pygame.Surface, Tuple[int, int]]] = []
+
+        # everything's timed if there's a profiler, with the overlay showing
+        # the frame times in the corner of the window
+        self.profiler: Optional[Profiler] = profiler
+        self.overlay: bool = overlay
+        self.font: Optional[pygame.font.Font] = None
+        # when the first frame made it to the screen, for the startup report
+        self.first_frame: Optional[float] = None
 
     def __repr__(self) -> str:
         return "<Application width={0} height={1} caption={2}>".format(
             self.width, self.height, self.caption
         )
 
-    def send(self, type_: Any, event: Optional[pygame.event.EventType] = None) -> None:
+    def send(self, type_: Union[int, str], *args: Any) -> None:
+        # handlers get the app and whatever's sent along with the event: the
+        # pygame event for pygame's events, the interpolation alpha for render,
+        # the tile for tilechange and nothing for start and update
         try:
             e = self.events[type_]
         except KeyError:
             return
-        if type_ in ("start", "update"):
-            e(self)
-
+        if self.profiler is not None:
+            name = type_ if isinstance(type_, str) else pygame.event.event_name(type_)
+            with self.profiler.measure(name.lower()):
+                self.call(e, *args)
         else:
-            e(self, event)
+            self.call(e, *args)
+
+    def call(self, e: Callable, *args: Any) -> None:
+        e(self, *args)
+
+    def measure(self, name: str) -> ContextManager:
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.measure(name)
 
     def on(self, ev: str) -> Callable:
         def deco(func) -> Callable:
-            if ev in ("start", "update"):
+            if ev in CUSTOM_EVENTS:
                 self.events[ev] = func
                 return func
 
@@ -76,19 +128,90 @@ class Application:
         pygame.quit()
         self.stopped = True
 
-    def run(self, *, fps: int = 60) -> None:
+    def invalidate(self, rect: Union[pygame.Rect, Tuple[int, int, int, int]]) -> None:
+        self.dirty.append(pygame.Rect(rect))
+
+    def draw(self, surface: pygame.Surface, pos: Tuple[int, int]) -> None:
+        self.draws.append((surface, pos))
+
+    def draw_queued(self) -> None:
+        if self.draws:
+            rects = self.display.blits(self.draws, doreturn=True)
+            if rects is not None:
+                self.dirty.extend(rects)
+            self.draws = []
+
+    def draw_overlay(self, profiler: Profiler) -> None:
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 18)
+        p50, p95, p99 = profiler.percentiles("frame")
+        text = "frame p50 {0:.1f}ms p95 {1:.1f}ms p99 {2:.1f}ms".format(
+            p50 * 1000, p95 * 1000, p99 * 1000
+        )
+        surf = self.font.render(text, True, (255, 255, 255), (0, 0, 0))
+        self.invalidate(self.display.blit(surf, (5, self.height - surf.get_height())))
+
+    def flip(self) -> None:
+        with self.measure("draw"):
+            self.draw_queued()
+        if self.profiler is not None and self.overlay:
+            self.draw_overlay(self.profiler)
+        with self.measure("flip"):
+            self.update_display()
+
+    def update_display(self) -> None:
+        if self.dirty_rects:
+            pygame.display.update(self.stale + self.dirty)
+            self.stale = self.dirty
+        else:
+            pygame.display.update()
+        self.dirty = []
+
+    def advance(
+        self, lag: float, step: float, speed: float, budget: float
+    ) -> Tuple[float, float]:
+        # runs however many updates are owed, returning the time left over and
+        # how far that is into the next update for the render to interpolate
+        start = time.perf_counter()
+        if not speed:
+            while time.perf_counter() - start < budget:
+                self.send("update")
+            return 0.0, 1.0
+
+        while lag >= step:
+            self.send("update")
+            lag -= step
+            if time.perf_counter() - start > budget:
+                # too far behind to ever catch up, so let the game slow down
+                # instead of spending every frame from now on catching up
+                lag = 0.0
+                break
+        return lag, lag / step
+
+    def run(
+        self, *, fps: int = 60, tick_rate: Optional[int] = None, speed: float = 1.0
+    ) -> None:
+        # with no tick rate there's an update for every frame. otherwise there
+        # are tick_rate * speed updates a second however many frames get
+        # drawn, and a speed of 0 fits in as many updates as it can
         self.send("start")
+        self.draw_queued()
         pygame.display.update()
+        self.stale, self.dirty = self.dirty, []
 
         def handle_pygame_error(error) -> None:
             if str(error) == "display Surface quit":
                 return
             traceback.print_exception(type(error), error, error.__traceback__)
 
+        lag = 0.0
+        last = time.perf_counter()
         while True:
             if self.stopped:
                 break
 
+            frame_start = time.perf_counter()
             for event in pygame.event.get():
                 try:
                     self.send(event.type, event)
@@ -97,19 +220,23 @@ class Application:
                 if event.type == pygame.QUIT:
                     self.stopped = True
             try:
-                self.send("update")
+                now = time.perf_counter()
+                if tick_rate is None:
+                    self.send("update")
+                    alpha = 1.0
+                else:
+                    lag += (now - last) * speed
+                    lag, alpha = self.advance(lag, 1 / tick_rate, speed, 1 / fps)
+                last = now
+                self.send("render", alpha)
             except pygame.error as message:
                 handle_pygame_error(message)
             else:
-                pygame.display.update()
+                self.flip()
+                if self.first_frame is None:
+                    self.first_frame = time.perf_counter()
+                if self.profiler is not None:
+                    self.profiler.record("frame", frame_start, time.perf_counter())
                 self.clock.tick(fps)
 
         pygame.quit()
-
-    def add_sprite(self, sprite: T, name: str) -> None:
-        sprite.app = self
-        self.sprites[name] = sprite
-
-    def get_sprite(self, name: str) -> T:
-        res = self.sprites[name]
-        return res
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import contextlib
+import json
+from typing import Dict, Optional, Tuple
+
+with contextlib.redirect_stdout(None):
+    import pygame
+
+ASSETS = "../assets/"
+
+
+class Assets:
+    # hands out the images packed into the atlas by images.py, decoding it
+    # once and cutting everything out of it as subsurfaces
+    def __init__(self, path: str = ASSETS) -> None:
+        self.path: str = path
+        self.atlas: Optional[pygame.Surface] = None
+        self.index: Dict[str, Tuple[int, int, int, int]] = dict()
+        self.images: Dict[str, pygame.Surface] = dict()
+
+    def __repr__(self) -> str:
+        return "<Assets path={0} loaded={1}>".format(
+            self.path, self.atlas is not None
+        )
+
+    def load(self) -> pygame.Surface:
+        with open(self.path + "atlas.json") as f:
+            index = json.load(f)["images"]
+        self.index = {name: tuple(rect) for name, rect in index.items()}
+
+        self.atlas = atlas = pygame.image.load(self.path + "atlas.png")
+        self.images.clear()
+        if pygame.display.get_surface() is not None:
+            atlas = self.convert()
+        return atlas
+
+    def convert(self) -> pygame.Surface:
+        # match the display's pixel format so blitting doesn't have to
+        # convert every pixel every time, this needs the window to be open
+        if self.atlas is None:
+            return self.load()
+        self.atlas = atlas = self.atlas.convert_alpha()
+        self.images.clear()
+        return atlas
+
+    def get(self, name: str) -> pygame.Surface:
+        try:
+            return self.images[name]
+        except KeyError:
+            pass
+
+        atlas = self.atlas if self.atlas is not None else self.load()
+        image = self.images[name] = atlas.subsurface(self.index[name])
+        return image
+
+    __getitem__ = get
+
+
+assets = Assets()
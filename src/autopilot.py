@@ -0,0 +1,141 @@
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import List, Optional
+
+from board import BITS, INVERSES
+from enums import Direction
+from game import Game, Snapshot
+from ghost import DIRECTIONS
+from levels import open_level
+from pacman import PacmanSprite
+from paths import check_swarm_paths, load_paths
+
+# how much losing a life counts against the score
+LIFE = 1000
+
+
+class Autopilot:
+    # plays pacman by looking ahead. every time he's on a tile, each way he
+    # could go is played forward from a snapshot of the game a few times,
+    # with random turns after that, and he goes the way that did best. the
+    # ghosts always do the same thing when pacman does, so the best of the
+    # tries is something he can actually do rather than luck. none of it
+    # touches the game being played, it all happens in a copy of it
+    def __init__(self, rollouts: int = 4, depth: int = 64, seed: int = 0) -> None:
+        if rollouts < 1 or depth < 1:
+            raise ValueError("the autopilot needs at least one rollout of one tick")
+        self.rollouts: int = rollouts
+        # how many ticks each try goes for
+        self.depth: int = depth
+        self.rng: random.Random = random.Random(seed)
+        # the game being played and the one the looking ahead happens in
+        self.game: Optional[Game] = None
+        self.scratch: Optional[Game] = None
+        # how many ticks have been played looking ahead, for seeing what
+        # deciding costs
+        self.simulated: int = 0
+
+    def __repr__(self) -> str:
+        return "<Autopilot rollouts={0} depth={1}>".format(self.rollouts, self.depth)
+
+    def choose(self, game: Game) -> Optional[Direction]:
+        # which way pacman should go, or None if he can't turn right now
+        pacman: PacmanSprite = game.get_sprite("pacman")
+        if pacman.dead or pacman.won or pacman.x % 24 or (pacman.y - 24) % 24:
+            return None
+
+        if game is not self.game or self.scratch is None:
+            swarm = 0 if game.swarm is None else len(game.swarm)
+            self.game = game
+            self.scratch = Game(game.board.copy(), game.paths, swarm)
+        scratch = self.scratch
+        snapshot = game.snapshot()
+
+        best, best_value = None, float("-inf")
+        for direction in self.ways(game, pacman, turn_back=True):
+            value = max(
+                self.rollout(scratch, snapshot, direction)
+                for _ in range(self.rollouts)
+            )
+            if value > best_value:
+                best, best_value = direction, value
+        return best
+
+    def rollout(self, game: Game, snapshot: Snapshot, first: Direction) -> float:
+        # plays game on from snapshot, which game is left at the end of
+        game.restore(snapshot)
+        pacman: PacmanSprite = game.get_sprite("pacman")
+        score, lives = pacman.score, pacman.lives
+
+        pacman.next_direction = first
+        for _ in range(self.depth):
+            game.step()
+            if pacman.dead or pacman.won:
+                break
+            if not (pacman.x % 24 or (pacman.y - 24) % 24):
+                pacman.next_direction = self.rng.choice(self.ways(game, pacman))
+        self.simulated += game.ticks - snapshot.ticks
+        return pacman.score - score - (lives - pacman.lives) * LIFE
+
+    def ways(
+        self, game: Game, pacman: PacmanSprite, turn_back: bool = False
+    ) -> List[Direction]:
+        # the ways pacman can go from the tile he's on. without turn_back
+        # he only goes back the way he came at a dead end, otherwise the
+        # random tries mostly dither about where they started
+        mask = game.board.opens(pacman.x // 24, (pacman.y - 24) // 24)
+        ways = [d for d in DIRECTIONS if mask & BITS[d]]
+        if not turn_back and len(ways) > 1:
+            back = INVERSES[pacman.current_direction]
+            ways = [d for d in ways if d != back]
+        return ways
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="autopilot", description="watch the autopilot play without a display"
+    )
+    parser.add_argument("level", nargs="?", default="test")
+    parser.add_argument("--rollouts", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pathfinding", choices=("bfs", "table"))
+    parser.add_argument("--swarm", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+    if args.rollouts < 1 or args.depth < 1:
+        parser.error("--rollouts and --depth have to be at least 1")
+
+    board = open_level(args.level)
+    if args.swarm:
+        try:
+            check_swarm_paths(args.pathfinding, board)
+        except ValueError as error:
+            parser.error(str(error))
+    game = Game(board, load_paths(args.pathfinding, board), args.swarm)
+    pilot = Autopilot(args.rollouts, args.depth, args.seed)
+    pacman: PacmanSprite = game.get_sprite("pacman")
+
+    start = time.perf_counter()
+    decisions = 0
+    while not (pacman.dead or pacman.won):
+        direction = pilot.choose(game)
+        if direction is not None:
+            pacman.next_direction = direction
+            decisions += 1
+        game.step()
+        game.changed.clear()
+    elapsed = time.perf_counter() - start
+
+    result = "won" if pacman.won else "died"
+    print(
+        "{0} after {1} ticks with a score of {2} and {3} lives left".format(
+            result, game.ticks, pacman.score, pacman.lives
+        )
+    )
+    print(
+        "{0} decisions, {1} ticks looked ahead, {2:.2f}s ({3:.1f}ms a decision)".format(
+            decisions, pilot.simulated, elapsed, elapsed / max(decisions, 1) * 1000
+        )
+    )
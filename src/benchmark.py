@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+# has to be set before pygame is imported for it to work without a screen
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from board import Board, parse_board
+from enums import Tile
+from game import Game
+from ghost import DIRECTIONS
+from pacman import PacmanSprite
+from profiler import Profiler
+
+# the timings --compare fails on. the rest (single sprites, parsing, drawing
+# the background) take microseconds and are mostly noise at that scale, so
+# they're only reported
+GATED = ("step", "frame_dirty", "frame_full")
+
+
+def synthetic_board(size: int) -> str:
+    # a wall round the edge and a grid of pillars inside it, which keeps
+    # the tiles pacman and the ghosts start on open whatever the size
+    rows = []
+    for y in range(size):
+        row = ""
+        for x in range(size):
+            edge = x in (0, size - 1) or y in (0, size - 1)
+            row += "-" if edge or (x % 4 == 3 and y % 4 == 3) else "*"
+        rows.append(row)
+    return "\n".join(rows)
+
+
+def stats(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    last = len(timings) - 1
+    return {
+        "mean": statistics.fmean(timings),
+        "p50": timings[round(last * 0.5)],
+        "p95": timings[round(last * 0.95)],
+    }
+
+
+def best_of(runs: List[List[float]]) -> Dict[str, float]:
+    # the same thing timed a few times over. best is the lowest mean of any
+    # run, which is what the code can do with the least else going on, and
+    # spread is how much slower the slowest run was than that, for telling
+    # a regression from a noisy machine
+    means = [statistics.fmean(timings) for timings in runs]
+    result = stats([timing for timings in runs for timing in timings])
+    result["best"] = min(means)
+    result["spread"] = max(means) / min(means) - 1
+    return result
+
+
+def repeat(func: Callable, times: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(times):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return stats(timings)
+
+
+def script(game: Game, rng: random.Random, tick: int) -> None:
+    pacman: PacmanSprite = game.get_sprite("pacman")
+    if tick % 24 == 0:
+        pacman.next_direction = rng.choice(DIRECTIONS)
+    # keep pacman going so that every tick does the same amount of work
+    pacman.dead = pacman.won = False
+    pacman.lives = 3
+
+
+def bench_eat_coin(data: str) -> Dict[str, float]:
+    game = Game(parse_board(data))
+    pacman: PacmanSprite = game.get_sprite("pacman")
+    board = game.board
+    coins = [
+        (x, y)
+        for y in range(board.height)
+        for x in range(board.width)
+        if board.get(x, y) == Tile.COIN
+    ][:2000]
+
+    timings = []
+    for x, y in coins:
+        pacman.move(pacman.image, (x * 24, y * 24 + 24))
+        start = time.perf_counter()
+        pacman.eat_coin(board)
+        timings.append(time.perf_counter() - start)
+    return stats(timings)
+
+
+def bench_step(data: str, ticks: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    runs = []
+    for _ in range(repeats):
+        game = Game(parse_board(data))
+        rng = random.Random(0)
+        timings = []
+        for tick in range(ticks):
+            script(game, rng, tick)
+            start = time.perf_counter()
+            game.step()
+            timings.append(time.perf_counter() - start)
+            game.changed.clear()
+        runs.append(timings)
+
+    # then again with every sprite timed on its own
+    game = Game(parse_board(data))
+    game.profiler = Profiler(samples=ticks)
+    rng = random.Random(0)
+    for tick in range(ticks):
+        script(game, rng, tick)
+        game.step()
+        game.changed.clear()
+
+    results = {"step": best_of(runs)}
+    for name, sprite_timings in game.profiler.timings.items():
+        results["update_" + name] = stats(list(sprite_timings))
+    return results
+
+
+def bench_memory(data: str) -> Dict[str, int]:
+    tracemalloc.start()
+    board = parse_board(data)
+    _, board_peak = tracemalloc.get_traced_memory()
+    game = Game(board)
+    for _ in range(60):
+        game.step()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"board_peak": board_peak, "game_current": current, "game_peak": peak}
+
+
+def bench_render(
+    app, data: str, ticks: int, repeats: int
+) -> Dict[str, Dict[str, float]]:
+    from camera import Camera
+    from render import Background, render_frame, repaint_tile
+
+    def camera(board: Board) -> Camera:
+        return Camera(app.width, app.height, board.width * 24, board.height * 24 + 24)
+
+    board = parse_board(data)
+
+    def draw_background() -> None:
+        # from nothing, so this is every chunk on screen being drawn
+        Background(board).draw(app.display, camera(board))
+
+    results = {"render_background": repeat(draw_background, 3)}
+    for mode, dirty_rects in (("frame_dirty", True), ("frame_full", False)):
+        app.dirty_rects = dirty_rects
+        runs = []
+        for _ in range(repeats):
+            app.game = Game(parse_board(data))
+            app.background = Background(app.game.board)
+            app.camera = camera(app.game.board)
+            app.camera.follow(*app.game.get_sprite("pacman").position)
+            app.background.draw(app.display, app.camera)
+            app.dirty, app.stale = [], []
+
+            rng = random.Random(0)
+            timings = []
+            for tick in range(ticks):
+                script(app.game, rng, tick)
+                start = time.perf_counter()
+                app.game.step()
+                for pos in app.game.changed:
+                    repaint_tile(app, pos)
+                app.game.changed.clear()
+                render_frame(app, 1.0)
+                app.flip()
+                timings.append(time.perf_counter() - start)
+            runs.append(timings)
+        results[mode] = best_of(runs)
+    return results
+
+
+def run(sizes: List[int], ticks: int, repeats: int, render: bool) -> dict:
+    app = None
+    if render:
+        from application import Application
+        from assets import assets
+
+        app = Application(
+            caption="PacMan benchmark",
+            width=576,
+            height=600,
+            icon=assets["pacman_open_right"],
+        )
+        assets.convert()
+
+    results = {
+        "python": platform.python_version(),
+        "ticks": ticks,
+        "repeats": repeats,
+        "sizes": {},
+    }
+    for size in sizes:
+        print("benchmarking {0}x{0}".format(size), file=sys.stderr)
+        data = synthetic_board(size)
+        result = {
+            "parse_board": repeat(lambda: parse_board(data), 3),
+            "eat_coin": bench_eat_coin(data),
+            "memory": bench_memory(data),
+        }
+        result.update(bench_step(data, ticks, repeats))
+        if app is not None:
+            result.update(bench_render(app, data, ticks, repeats))
+        results["sizes"][str(size)] = result
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = dict()
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "/"))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(
+    baseline: dict, results: dict, threshold: float
+) -> Tuple[List[str], List[str]]:
+    # the GATED timings are regressions if their best run got slower by more
+    # than threshold plus however noisy either set of runs was. anything
+    # else that got more than threshold slower (or bigger) is only noted,
+    # everything measured is a time or a size so bigger is always worse
+    regressions, notes = [], []
+    for size in sorted(baseline["sizes"].keys() & results["sizes"].keys(), key=int):
+        old, new = baseline["sizes"][size], results["sizes"][size]
+        for name in GATED:
+            if "best" not in old.get(name, {}) or name not in new:
+                continue
+            before, after = old[name]["best"], new[name]["best"]
+            allowed = threshold + max(old[name]["spread"], new[name]["spread"])
+            if after > before * (1 + allowed):
+                regressions.append(
+                    "{0}/{1}: {2:.6g} -> {3:.6g} (+{4:.0%}, allowed +{5:.0%})".format(
+                        size, name, before, after, after / before - 1, allowed
+                    )
+                )
+
+    old, new = flatten(baseline["sizes"]), flatten(results["sizes"])
+    for key in sorted(old.keys() & new.keys()):
+        if key.split("/")[1] in GATED or key.endswith("/spread"):
+            continue
+        if old[key] and new[key] > old[key] * (1 + threshold):
+            notes.append(
+                "{0}: {1:.6g} -> {2:.6g} (+{3:.0%})".format(
+                    key, old[key], new[key], new[key] / old[key] - 1
+                )
+            )
+    return regressions, notes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="time the hot paths on synthetic boards of different sizes",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[24, 64, 128, 256],
+        help="comma separated board sizes in tiles (default 24,64,128,256)",
+    )
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="how many times to run the step and frame timings, the best run is "
+        "what gets compared (default 5)",
+    )
+    parser.add_argument(
+        "--no-render", action="store_true", help="only benchmark the game logic"
+    )
+    parser.add_argument("--output", metavar="FILE", help="write the results to FILE")
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="compare against the results in BASELINE, exiting with 1 if a step or "
+        "frame got slower",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="how much slower something has to be to count as a regression, on "
+        "top of how much the repeats varied (default 0.1)",
+    )
+    args = parser.parse_args()
+
+    if args.repeats < 1:
+        parser.error("--repeats has to be at least 1")
+
+    results = run(args.sizes, args.ticks, args.repeats, not args.no_render)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions, notes = compare(json.load(f), results, args.threshold)
+        for note in notes:
+            print("not gated: " + note, file=sys.stderr)
+        for regression in regressions:
+            print("regression: " + regression, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
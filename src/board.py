@@ -0,0 +1,212 @@
+from __future__ import annotations
+from collections import Counter
+import hashlib
+import struct
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from enums import Direction, Tile
+
+BITS = {Direction.RIGHT: 1, Direction.LEFT: 2, Direction.UP: 4, Direction.DOWN: 8}
+OFFSETS = {
+    Direction.RIGHT: (1, 0),
+    Direction.LEFT: (-1, 0),
+    Direction.UP: (0, -1),
+    Direction.DOWN: (0, 1),
+}
+# every possible mask -> the directions in it, so turning a mask back into
+# directions is a single index
+OPEN_DIRECTIONS: List[FrozenSet[Direction]] = [
+    frozenset(d for d in BITS if mask & BITS[d]) for mask in range(16)
+]
+TILES = sorted(Tile, key=lambda tile: tile.value)
+INVERSES = {
+    Direction.RIGHT: Direction.LEFT,
+    Direction.LEFT: Direction.RIGHT,
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.NONE: Direction.NONE,
+}
+
+Route = Tuple[Direction, ...]
+
+SPAWNS = ("pacman", "blinky", "pinky", "clyde", "inky")
+# what marks where each of them starts in a .board file, there's a coin under
+# every one of them
+MARKERS = {"P": "pacman", "b": "blinky", "p": "pinky", "c": "clyde", "i": "inky"}
+
+
+class Board:
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tiles: bytearray,
+        spawns: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.tiles: bytearray = tiles
+        # whether tiles, counts and open might belong to a copy as well, see
+        # copy()
+        self.shared: bool = False
+
+        # how many of each tile there are, kept up to date by set() so
+        # nothing has to go through the whole board to count coins
+        self.counts: Counter = Counter(TILES[item] for item in tiles)
+
+        # bitmask of the directions you can move in from each tile
+        self.open: bytearray = bytearray(width * height)
+        for y in range(height):
+            for x in range(width):
+                self._update_open(x, y)
+
+        self.junctions: List[int]
+        self.corridors: Dict[Tuple[int, Direction], Tuple[Route, int]]
+        self.build_graph()
+
+        # the tile everything starts on, anything the level doesn't say goes
+        # on the open tile nearest to where it started on the original board
+        self.spawns: Dict[str, Tuple[int, int]] = dict(spawns or {})
+        defaults = {
+            "pacman": (width // 2, height // 2),
+            "blinky": (width - 2, 1),
+            "pinky": (1, 1),
+            "clyde": (1, height - 2),
+            "inky": (width - 2, height - 2),
+        }
+        for name in SPAWNS:
+            if name not in self.spawns:
+                self.spawns[name] = self.nearest_open(*defaults[name])
+
+    def __repr__(self) -> str:
+        return "<Board width={0} height={1}>".format(self.width, self.height)
+
+    def copy(self) -> Board:
+        # a new board in the same state, without working everything out
+        # again or copying anything. the two share their tiles until one of
+        # them changes one, when set() gives it its own first. the graph is
+        # only ever replaced rather than changed, so that's shared for good
+        board = Board.__new__(Board)
+        board.width, board.height = self.width, self.height
+        board.tiles, board.counts, board.open = self.tiles, self.counts, self.open
+        board.junctions, board.corridors = self.junctions, self.corridors
+        board.spawns = self.spawns
+        board.shared = self.shared = True
+        return board
+
+    def digest(self) -> str:
+        # identifies the layout as it is right now, so whatever gets worked
+        # out from a level can be cached against it
+        size = struct.pack("<HH", self.width, self.height)
+        return hashlib.sha1(size + bytes(self.tiles)).hexdigest()
+
+    def inside(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x: int, y: int) -> Tile:
+        return TILES[self.tiles[y * self.width + x]]
+
+    def set(self, x: int, y: int, tile: Tile) -> None:
+        if self.shared:
+            self.tiles = bytearray(self.tiles)
+            self.counts = Counter(self.counts)
+            self.open = bytearray(self.open)
+            self.shared = False
+
+        old = self.get(x, y)
+        self.counts[old] -= 1
+        self.counts[tile] += 1
+        self.tiles[y * self.width + x] = tile.value
+
+        if (old == Tile.WALL) != (tile == Tile.WALL):
+            self._update_open(x, y)
+            for dx, dy in OFFSETS.values():
+                if self.inside(x + dx, y + dy):
+                    self._update_open(x + dx, y + dy)
+            self.build_graph()
+
+    def opens(self, x: int, y: int) -> int:
+        return self.open[y * self.width + x]
+
+    def nearest_open(self, x: int, y: int) -> Tuple[int, int]:
+        # looks in bigger and bigger squares around x, y, so it's quick when
+        # there's somewhere open close by, which there nearly always is
+        for radius in range(max(self.width, self.height)):
+            ring = [
+                (nx, ny)
+                for ny in range(y - radius, y + radius + 1)
+                for nx in range(x - radius, x + radius + 1)
+                if max(abs(nx - x), abs(ny - y)) == radius
+                and self.inside(nx, ny)
+                and self.get(nx, ny) != Tile.WALL
+            ]
+            if ring:
+                return min(ring, key=lambda pos: (pos[0] - x) ** 2 + (pos[1] - y) ** 2)
+        raise ValueError("there's nowhere open to start")
+
+    def is_junction(self, index: int) -> bool:
+        # anywhere you don't just have a way in and a way out, so crossroads,
+        # t-junctions and dead ends
+        return (
+            self.tiles[index] != Tile.WALL.value
+            and len(OPEN_DIRECTIONS[self.open[index]]) != 2
+        )
+
+    def build_graph(self) -> None:
+        # the junctions are the nodes and the corridors between them are the
+        # edges. each corridor is stored as the turns to take on every tile
+        # after leaving the junction, up to (not including) the junction at
+        # the other end
+        self.junctions = [i for i in range(len(self.tiles)) if self.is_junction(i)]
+        self.corridors = dict()
+        for start in self.junctions:
+            for direction in OPEN_DIRECTIONS[self.open[start]]:
+                self.corridors[(start, direction)] = self._follow(start, direction)
+
+    def _follow(self, start: int, direction: Direction) -> Tuple[Route, int]:
+        route = []
+        index = start
+        for _ in range(len(self.tiles)):
+            dx, dy = OFFSETS[direction]
+            index += dy * self.width + dx
+            if self.is_junction(index):
+                break
+            mask = self.open[index] & ~BITS[INVERSES[direction]]
+            (direction,) = OPEN_DIRECTIONS[mask]
+            route.append(direction)
+        return tuple(route), index
+
+    def corridor(self, x: int, y: int, direction: Direction) -> Route:
+        route, _ = self.corridors.get((y * self.width + x, direction), ((), -1))
+        return route
+
+    def _update_open(self, x: int, y: int) -> None:
+        mask = 0
+        for direction, (dx, dy) in OFFSETS.items():
+            nx, ny = x + dx, y + dy
+            if self.inside(nx, ny) and self.get(nx, ny) != Tile.WALL:
+                mask |= BITS[direction]
+        self.open[y * self.width + x] = mask
+
+
+def parse_board(board: str) -> Board:
+    tiles_dict = {"-": Tile.WALL, "*": Tile.COIN, " ": Tile.BLANK}
+    rows = board.rstrip("\n").split("\n")
+    width = max(len(row) for row in rows)
+
+    tiles = bytearray()
+    spawns = dict()
+    for y, row in enumerate(rows):
+        for x, item in enumerate(row):
+            if item in MARKERS:
+                spawns[MARKERS[item]] = (x, y)
+                item = "*"
+            try:
+                tiles.append(tiles_dict[item].value)
+            except KeyError:
+                raise ValueError(
+                    "unknown tile {0!r} at {1}, {2}".format(item, x, y)
+                ) from None
+        # anything past the end of a short row counts as wall
+        tiles.extend(Tile.WALL.value for _ in range(width - len(row)))
+    return Board(width, len(rows), tiles, spawns)
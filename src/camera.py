@@ -0,0 +1,42 @@
+from typing import Tuple
+
+
+class Camera:
+    # the part of the board that's on screen. x and y are where its top left
+    # corner is in the same pixels the sprites move around in
+    def __init__(
+        self, width: int, height: int, world_width: int, world_height: int
+    ) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.world_width: int = world_width
+        self.world_height: int = world_height
+        self.x: int = 0
+        self.y: int = 0
+
+    def __repr__(self) -> str:
+        return "<Camera x={0} y={1} width={2} height={3}>".format(
+            self.x, self.y, self.width, self.height
+        )
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        return self.x, self.y, self.width, self.height
+
+    def follow(self, x: int, y: int) -> bool:
+        # centres on the tile at x, y without going past the edge of the
+        # board, returning whether that moved the camera
+        old = self.x, self.y
+        self.x = max(0, min(x + 12 - self.width // 2, self.world_width - self.width))
+        self.y = max(
+            0, min(y + 12 - self.height // 2, self.world_height - self.height)
+        )
+        return (self.x, self.y) != old
+
+    def visible(self, x: int, y: int, width: int = 24, height: int = 24) -> bool:
+        return (
+            x < self.x + self.width
+            and self.x < x + width
+            and y < self.y + self.height
+            and self.y < y + height
+        )
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from board import Board
+from enums import Direction
+from game import Game
+from levels import open_level
+from observe import PixelView, TileGrid, TilePlanes
+from pacman import PacmanSprite
+from paths import load_paths
+
+# what each action does, 0 leaves pacman going the way he's going
+ACTIONS = (
+    Direction.NONE,
+    Direction.UP,
+    Direction.DOWN,
+    Direction.LEFT,
+    Direction.RIGHT,
+)
+OBSERVATIONS = ("grid", "planes", "pixels")
+
+
+class PacmanEnv:
+    # the game as an environment to train and test agents in, stepping it as
+    # fast as it'll go rather than at the frame rate. every step runs
+    # ticks_per_step ticks with the same action, and the reward is how much
+    # the score went up over them. observations are the tiles as one grid,
+    # a plane for each thing in observe.PLANES, or the pixels of a width x
+    # height window onto the game. they're the same array every step, filled
+    # in again each time, so copy anything that needs keeping
+    def __init__(
+        self,
+        level: str = "test",
+        *,
+        pathfinding: Optional[str] = None,
+        swarm: int = 0,
+        ticks_per_step: int = 1,
+        max_ticks: int = 100 * 60,
+        observation: str = "grid",
+        width: int = 576,
+        height: int = 576,
+    ) -> None:
+        if observation not in OBSERVATIONS:
+            raise ValueError("unknown observation {0!r}".format(observation))
+        # loaded once, every game starts from a copy of it
+        self.board: Board = open_level(level)
+        self.paths = load_paths(pathfinding, self.board)
+        self.swarm: int = swarm
+        self.ticks_per_step: int = ticks_per_step
+        self.max_ticks: int = max_ticks
+        self.game: Game
+        self.observation: str = observation
+        # the size of the window onto the game for pixel observations
+        self.width: int = width
+        self.height: int = height
+        self.observer: Union[TileGrid, TilePlanes, PixelView]
+        self.buffer: np.ndarray
+        self.observation_shape: Tuple[int, ...]
+        self.observe_into()
+        self.action_count: int = len(ACTIONS)
+
+    def __repr__(self) -> str:
+        return "<PacmanEnv board={0!r} observation={1} ticks_per_step={2}>".format(
+            self.board, self.observation, self.ticks_per_step
+        )
+
+    @property
+    def pacman(self) -> PacmanSprite:
+        return self.game.get_sprite("pacman")
+
+    def reset(self) -> np.ndarray:
+        self.game = Game(self.board.copy(), self.paths, self.swarm)
+        observation = self.observe()
+        self.game.changed.clear()
+        return observation
+
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
+        game, pacman = self.game, self.pacman
+        if ACTIONS[action] != Direction.NONE:
+            pacman.next_direction = ACTIONS[action]
+
+        score = pacman.score
+        for _ in range(self.ticks_per_step):
+            game.step()
+            if pacman.dead or pacman.won:
+                break
+        # after looking, the pixels need to know what's changed
+        observation = self.observe()
+        game.changed.clear()
+
+        truncated = game.ticks >= self.max_ticks
+        done = pacman.dead or pacman.won or truncated
+        info = {"ticks": game.ticks, "lives": pacman.lives, "truncated": truncated}
+        return observation, float(pacman.score - score), done, info
+
+    def observe(self) -> np.ndarray:
+        return self.observer(self.game)
+
+    def observe_into(self, buffer: Optional[np.ndarray] = None) -> None:
+        # where observations get written from now on, an array shaped like
+        # self.buffer or a new one if it's None
+        if self.observation == "pixels":
+            self.observer = PixelView(self.width, self.height, buffer)
+        else:
+            kind = TilePlanes if self.observation == "planes" else TileGrid
+            self.observer = kind(self.board.width, self.board.height, buffer)
+        self.buffer = self.observer.buffer
+        self.observation_shape = self.observer.shape
+
+
+class VectorEnv:
+    # a number of games stepped together, taking an array of actions and
+    # giving back arrays of observations, rewards and dones. anything that
+    # finishes starts again straight away, its last observation is in the
+    # info for it
+    def __init__(self, count: int, level: str = "test", **kwargs: Any) -> None:
+        self.envs: List[PacmanEnv] = [PacmanEnv(level, **kwargs) for _ in range(count)]
+        # every env writes its observations straight into its own part of
+        # one array, so there's nothing to copy when they're all stepped
+        first = self.envs[0]
+        buffer = np.zeros((count,) + first.buffer.shape, first.buffer.dtype)
+        for env, part in zip(self.envs, buffer):
+            env.observe_into(part)
+        self.observations: np.ndarray = first.observer.view(buffer)
+        self.rewards: np.ndarray = np.zeros(count, dtype=np.float32)
+        self.dones: np.ndarray = np.zeros(count, dtype=bool)
+
+    def __repr__(self) -> str:
+        return "<VectorEnv envs={0}>".format(len(self.envs))
+
+    def __len__(self) -> int:
+        return len(self.envs)
+
+    def reset(self) -> np.ndarray:
+        for env in self.envs:
+            env.reset()
+        return self.observations
+
+    def step(
+        self, actions: Union[Sequence[int], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        infos = []
+        for n, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, reward, done, info = env.step(int(action))
+            if done:
+                # reset() is about to fill the same array in again
+                info["observation"] = observation.copy()
+                env.reset()
+            self.rewards[n] = reward
+            self.dones[n] = done
+            infos.append(info)
+        return self.observations, self.rewards, self.dones, infos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="env", description="time random agents playing through VectorEnv"
+    )
+    parser.add_argument("level", nargs="?", default="test")
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--observation", choices=OBSERVATIONS, default="grid")
+    args = parser.parse_args()
+
+    envs = VectorEnv(args.envs, args.level, observation=args.observation)
+    rng = np.random.default_rng(args.seed)
+    envs.reset()
+    games = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, dones, _ = envs.step(rng.integers(len(ACTIONS), size=len(envs)))
+        games += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    total = args.steps * len(envs)
+    print(
+        "{0} steps in {1:.2f}s ({2:.0f} steps/s), {3} games finished".format(
+            total, elapsed, total / elapsed, games
+        )
+    )
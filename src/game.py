@@ -0,0 +1,144 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from board import Board
+from ghost import add_ghosts
+from pacman import PacmanSprite
+from spatial import SpatialHash
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from paths import DistanceFields, PathTable
+    from profiler import Profiler
+    from sprite import Sprite
+    from swarm import GhostSwarm
+
+    T = TypeVar("T", bound=Sprite)
+
+# how many times step() is meant to be called for each second of game time
+TICK_RATE = 60
+
+
+class Snapshot:
+    # a game at one tick, as plain values with nothing to do with drawing it.
+    # the board is a copy, so until the game changes a tile this is a few
+    # tuples. it can be put back into the game it came from or any other
+    # game on the same level with the same ghosts
+    __slots__ = ("board", "ticks", "sprites", "swarm")
+
+    def __init__(
+        self,
+        board: Board,
+        ticks: int,
+        sprites: Tuple[Tuple[Any, ...], ...],
+        swarm: Optional[Tuple[np.ndarray, ...]],
+    ) -> None:
+        self.board: Board = board
+        self.ticks: int = ticks
+        # Sprite.save for each sprite, in the same order as Game.sprites
+        self.sprites: Tuple[Tuple[Any, ...], ...] = sprites
+        self.swarm: Optional[Tuple[np.ndarray, ...]] = swarm
+
+    def __repr__(self) -> str:
+        return "<Snapshot ticks={0}>".format(self.ticks)
+
+
+class Game:
+    def __init__(
+        self,
+        board: Board,
+        paths: Optional[Union[DistanceFields, PathTable]] = None,
+        swarm: int = 0,
+    ) -> None:
+        self.board: Board = board
+        # ghosts path find through the maze with these if they're set,
+        # otherwise they just head in a straight line for their target
+        self.paths: Optional[Union[DistanceFields, PathTable]] = paths
+
+        self.sprites: Dict[str, Sprite] = dict()
+        # the same sprites by where they are, for collisions
+        self.space: SpatialHash = SpatialHash()
+        # tiles that have changed since whatever's drawing the game last
+        # looked, it's up to that to clear this
+        self.changed: List[Tuple[int, int]] = []
+        self.ticks: int = 0
+        # times every sprite's update if it's set
+        self.profiler: Optional[Profiler] = None
+
+        # with a swarm the ghosts are all in there instead of being sprites
+        self.swarm: Optional[GhostSwarm] = None
+        self.add_sprite(PacmanSprite(self), "pacman")
+        if swarm:
+            # only imported when it's wanted since it needs numpy
+            from swarm import GhostSwarm
+
+            self.swarm = GhostSwarm(self, swarm)
+        else:
+            add_ghosts(self)
+
+    def __repr__(self) -> str:
+        return "<Game board={0!r} ticks={1}>".format(self.board, self.ticks)
+
+    @property
+    def time(self) -> float:
+        return self.ticks / TICK_RATE
+
+    def step(self) -> None:
+        for sprite in self.sprites.values():
+            sprite.previous = sprite.x, sprite.y
+        if self.profiler is None:
+            for sprite in self.sprites.values():
+                sprite.update()
+        else:
+            for name, sprite in self.sprites.items():
+                with self.profiler.measure(name):
+                    sprite.update()
+        if self.swarm is not None:
+            if self.profiler is None:
+                self.swarm.step()
+            else:
+                with self.profiler.measure("swarm"):
+                    self.swarm.step()
+        self.get_sprite("pacman").collide()
+        self.ticks += 1
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            self.board.copy(),
+            self.ticks,
+            tuple(sprite.save() for sprite in self.sprites.values()),
+            None if self.swarm is None else self.swarm.save(),
+        )
+
+    def restore(self, snapshot: Snapshot) -> None:
+        # back to how things were when snapshot was taken, which can be done
+        # any number of times. the board is a new copy, so anything drawing
+        # the game has to start again from that rather than from changed
+        self.board = snapshot.board.copy()
+        self.ticks = snapshot.ticks
+        for sprite, state in zip(self.sprites.values(), snapshot.sprites):
+            sprite.load(state)
+        if self.swarm is not None and snapshot.swarm is not None:
+            self.swarm.load(snapshot.swarm)
+        self.changed.clear()
+
+    def add_sprite(self, sprite: Sprite, name: str) -> None:
+        sprite.game = self
+        self.sprites[name] = sprite
+        self.space.add(sprite)
+
+    def get_sprite(self, name: str) -> T:
+        # whichever kind of sprite the caller asks for, like
+        # pacman: PacmanSprite = game.get_sprite("pacman")
+        return cast("T", self.sprites[name])
@@ -1,67 +1,74 @@
-import contextlib
+from typing import List
 
-with contextlib.redirect_stdout(None):
-    import pygame
-
-from sprite import Sprite
-from enums import Direction, GhostMode, Tile
-
-
-def load(file: str) -> pygame.Surface:
-    path = "../assets/" + file + ".png"
-    return pygame.image.load(path)
-
-
-GHOST_RED = load("ghost_red")
-GHOST_PINK = load("ghost_pink")
-GHOST_ORANGE = load("ghost_orange")
-GHOST_BLUE = load("ghost_blue")
+from sprite import Sprite, spawn_point
+from enums import Direction, GhostMode
+from board import INVERSES, OPEN_DIRECTIONS
 
 GHOST_SPEED = 2
-INVERSES = {
-    Direction.RIGHT: Direction.LEFT,
-    Direction.LEFT: Direction.RIGHT,
-    Direction.UP: Direction.DOWN,
-    Direction.DOWN: Direction.UP,
-    Direction.NONE: Direction.NONE,
-}
 DIRECTIONS = [Direction.UP, Direction.DOWN, Direction.RIGHT, Direction.LEFT]
 
 
 class Ghost(Sprite):
-    def __init__(self, app, display, image, position):
+    __slots__ = ("current_direction", "starting_position", "mode", "route")
+
+    def __init__(self, game, image, position):
         self.current_direction: Direction = Direction.RIGHT
         self.starting_position = position
         self.mode: GhostMode = GhostMode.CHASE
-        super().__init__(app, display, image, position)
+        # the turns left to take in the corridor the ghost is in, reversed
+        self.route: List[Direction] = []
+        super().__init__(game, image, position)
+
+    def reset(self):
+        self.move(self.image, self.starting_position)
+        self.route = []
+
+    def save(self):
+        return super().save(), self.current_direction, self.mode, tuple(self.route)
+
+    def load(self, state):
+        sprite, self.current_direction, self.mode, route = state
+        self.route = list(route)
+        super().load(sprite)
 
     def find_target(self):
+        # where on the board the ghost is heading, in pixels but without the
+        # row the hud takes up, the same as the ghost's own x, y get turned
+        # into in calculate_next_direction
         raise NotImplementedError
 
+    def home(self):
+        x, y = self.starting_position
+        return x, y - 24
+
     def filter_directions(self):
-        x, y = self.position
+        x, y = self.x, self.y
         y -= 24
-        directions = set(DIRECTIONS)
-        if self.app.board[y // 24 - 1][x // 24] == Tile.WALL:
-            directions.remove(Direction.UP)
-        if self.app.board[y // 24 + 1][x // 24] == Tile.WALL:
-            directions.remove(Direction.DOWN)
-        if self.app.board[y // 24][x // 24 + 1] == Tile.WALL:
-            directions.remove(Direction.RIGHT)
-        if self.app.board[y // 24][x // 24 - 1] == Tile.WALL:
-            directions.remove(Direction.LEFT)
-        try:
-            directions.remove(INVERSES[self.current_direction])
-        except KeyError:
-            pass
+        directions = set(OPEN_DIRECTIONS[self.game.board.opens(x // 24, y // 24)])
+        if len(directions) > 1:
+            # only turn around at a dead end
+            directions.discard(INVERSES[self.current_direction])
 
         return directions
 
     def calculate_next_direction(self, directions):
+        # always looked at in the same order so that ties between directions
+        # that are as good as each other go the same way every time
+        directions = [d for d in DIRECTIONS if d in directions]
+        if not directions:
+            return Direction.NONE
+
         tx, ty = self.find_target()
-        x, y = self.position
+        x, y = self.x, self.y
         y -= 24
 
+        if self.game.paths is not None:
+            direction = self.game.paths.best(
+                x // 24, y // 24, tx // 24, ty // 24, directions
+            )
+            if direction is not None:
+                return direction
+
         def calc_dist(px, py):
             return (px - tx) ** 2 + (py - ty) ** 2
 
@@ -82,12 +89,20 @@ class Ghost(Sprite):
         return final_direction[0]
 
     def update(self):
-        x, y = self.position
+        x, y = self.x, self.y
         y -= 24
         if x % 24 == 0 and y % 24 == 0:
-            self.current_direction = self.calculate_next_direction(
-                self.filter_directions()
-            )
+            if self.route:
+                # in a corridor there's only one way to go
+                self.current_direction = self.route.pop()
+            else:
+                self.current_direction = self.calculate_next_direction(
+                    self.filter_directions()
+                )
+                route = self.game.board.corridor(
+                    x // 24, y // 24, self.current_direction
+                )
+                self.route = list(reversed(route))
 
         direction = self.current_direction
         if direction == Direction.RIGHT:
@@ -98,27 +113,31 @@ class Ghost(Sprite):
             y -= GHOST_SPEED
         elif direction == Direction.DOWN:
             y += GHOST_SPEED
-        super().update(self.image, (x, y + 24))
+        self.move(self.image, (x, y + 24))
 
 
 class Blinky(Ghost):
-    def __init__(self, app):
-        super().__init__(app, app.display, GHOST_RED, (552 - 24, 48))
+    __slots__ = ()
+
+    def __init__(self, game):
+        super().__init__(game, "ghost_red", spawn_point(game, "blinky"))
 
     def find_target(self):
-        pacman = self.app.get_sprite("pacman")
+        pacman = self.game.get_sprite("pacman")
         if self.mode == GhostMode.CHASE:
-            return pacman.position
+            return pacman.x, pacman.y - 24
         else:
-            return (552, 48)
+            return (self.game.board.width - 1) * 24, 24
 
 
 class Pinky(Ghost):
-    def __init__(self, app):
-        super().__init__(app, app.display, GHOST_PINK, (24, 48))
+    __slots__ = ()
+
+    def __init__(self, game):
+        super().__init__(game, "ghost_pink", spawn_point(game, "pinky"))
 
     def find_target(self):
-        pacman = self.app.get_sprite("pacman")
+        pacman = self.game.get_sprite("pacman")
         px, py = pacman.position
         py -= 24
 
@@ -135,35 +154,47 @@ class Pinky(Ghost):
         if self.mode == GhostMode.CHASE:
             return px * 24, py * 24
         else:
-            return 24, 48
+            return self.home()
 
 
 class Clyde(Ghost):
-    def __init__(self, app):
-        super().__init__(app, app.display, GHOST_ORANGE, (24, 600 - 48))
+    __slots__ = ()
+
+    def __init__(self, game):
+        super().__init__(game, "ghost_orange", spawn_point(game, "clyde"))
 
     def find_target(self):
-        pacman = self.app.get_sprite("pacman")
+        pacman = self.game.get_sprite("pacman")
         px, py = pacman.position
         py -= 24
 
         px, py = px // 24, py // 24
 
-        x, y = self.position
-        x, y = x // 24, y // 24
+        x, y = self.x, self.y
+        x, y = x // 24, (y - 24) // 24
 
-        if max(x, px) - min(x, px) <= 8 and max(y, py) - min(y, py) <= 8:
-            return 24, 600 - 48
+        distance = None
+        if self.game.paths is not None:
+            distance = self.game.paths.distance(x, y, px, py)
+        if distance is None:
+            # no path (or no path finding), so just see if pacman is
+            # within a box 8 tiles either way
+            distance = max(abs(x - px), abs(y - py))
+
+        if distance <= 8:
+            return self.home()
         else:
-            return pacman.position
+            return pacman.x, pacman.y - 24
 
 
 class Inky(Ghost):
-    def __init__(self, app):
-        super().__init__(app, app.display, GHOST_BLUE, (552 - 24, 600 - 48))
+    __slots__ = ()
+
+    def __init__(self, game):
+        super().__init__(game, "ghost_blue", spawn_point(game, "inky"))
 
     def find_target(self):
-        pacman = self.app.get_sprite("pacman")
+        pacman = self.game.get_sprite("pacman")
         px, py = pacman.position
         py -= 24
 
@@ -177,15 +208,15 @@ class Inky(Ghost):
         elif direction == Direction.DOWN:
             py += 48
 
-        blinky = self.app.get_sprite("blinky")
+        blinky = self.game.get_sprite("blinky")
         bx, by = blinky.position
         by -= 24
 
         return px + (px - bx), py + (py - by)
 
 
-def add_ghosts(app):
-    app.add_sprite(Blinky(app), "blinky")
-    app.add_sprite(Pinky(app), "pinky")
-    app.add_sprite(Clyde(app), "clyde")
-    app.add_sprite(Inky(app), "inky")
+def add_ghosts(game):
+    game.add_sprite(Blinky(game), "blinky")
+    game.add_sprite(Pinky(game), "pinky")
+    game.add_sprite(Clyde(game), "clyde")
+    game.add_sprite(Inky(game), "inky")
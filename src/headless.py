@@ -0,0 +1,98 @@
+import argparse
+import os
+import random
+import time
+from typing import Callable, Optional
+
+from game import Game
+from ghost import DIRECTIONS
+from levels import open_level
+from pacman import PacmanSprite
+from paths import check_swarm_paths, load_paths
+from replay import Recorder
+
+
+def play(
+    game: Game,
+    ticks: int,
+    rng: random.Random,
+    turn_every: int = 30,
+    step: Optional[Callable[[], None]] = None,
+) -> int:
+    # steps the game with pacman picking a random way to go every so often,
+    # until it's over or it has run for the given number of ticks. step is
+    # what steps it if it isn't game.step, like a replay.Recorder
+    pacman: PacmanSprite = game.get_sprite("pacman")
+    step = step or game.step
+    for tick in range(ticks):
+        if pacman.dead or pacman.won:
+            return tick
+        if tick % turn_every == 0:
+            pacman.next_direction = rng.choice(DIRECTIONS)
+        step()
+        game.changed.clear()
+    return ticks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="headless", description="run games of pacman without a display"
+    )
+    parser.add_argument(
+        "level", help="name of the level in ../levels/ or the path to one"
+    )
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument(
+        "--ticks", type=int, default=100_000, help="most ticks to run each game for"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pathfinding", choices=("bfs", "table"))
+    parser.add_argument(
+        "--swarm",
+        type=int,
+        default=0,
+        metavar="N",
+        help="run N ghosts at once with numpy instead of the usual four",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        help="record every game into DIR, to play back with replay.py",
+    )
+    args = parser.parse_args()
+    if args.swarm:
+        try:
+            check_swarm_paths(args.pathfinding, open_level(args.level))
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    rng = random.Random(args.seed)
+    total = 0
+    start = time.perf_counter()
+    for n in range(args.games):
+        board = open_level(args.level)
+        game = Game(board, load_paths(args.pathfinding, board), args.swarm)
+
+        recorder = None
+        if args.record:
+            recorder = Recorder(game, args.level, args.pathfinding)
+        ticks = play(game, args.ticks, rng, step=recorder and recorder.step)
+        if recorder is not None:
+            recorder.save(os.path.join(args.record, "{0}.rec".format(n + 1)))
+        total += ticks
+        pacman: PacmanSprite = game.get_sprite("pacman")
+        result = "won" if pacman.won else "died" if pacman.dead else "unfinished"
+        print(
+            "game {0}: {1} after {2} ticks with a score of {3}".format(
+                n + 1, result, ticks, pacman.score
+            )
+        )
+
+    elapsed = time.perf_counter() - start
+    print(
+        "{0} ticks in {1:.2f}s ({2:.0f} ticks/s)".format(
+            total, elapsed, total / elapsed if elapsed else 0
+        )
+    )
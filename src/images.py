@@ -1,25 +1,58 @@
-from typing import Callable, Tuple
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import hashlib
+import inspect
+import json
+import os
+from typing import Callable, Dict, List, Tuple
 
 from PIL import Image
 from PIL import ImageDraw
 
+ASSETS = "../assets/"
+Colour = Tuple[int, int, int]
+
 
 def save_asset(func) -> Callable:
-    def deco(*args, filename: str, **kwargs) -> Image.Image:
+    @functools.wraps(func)
+    def deco(*args, filename: str, size: int = 24, **kwargs) -> Image.Image:
         ret = func(*args, **kwargs)
-        ret = ret.resize((24, 24))
-        ret.save("../assets/" + filename)
+        ret = ret.resize((size, size))
+        ret.save(ASSETS + filename)
         return ret
 
     return deco
 
 
+ATLAS_COLUMNS = 8
+
+
+def save_atlas(
+    images: Dict[str, Image.Image], size: int = 24, directory: str = ""
+) -> None:
+    # everything packed into one sheet so the game only decodes one file,
+    # atlas.json says where each image is in it
+    names = sorted(images)
+    rows = (len(names) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+    atlas = Image.new("RGBA", (ATLAS_COLUMNS * size, rows * size))
+    index = dict()
+    for n, name in enumerate(names):
+        x, y = n % ATLAS_COLUMNS * size, n // ATLAS_COLUMNS * size
+        atlas.paste(images[name], (x, y))
+        index[name] = [x, y, size, size]
+
+    atlas.save(ASSETS + directory + "atlas.png")
+    with open(ASSETS + directory + "atlas.json", "w") as f:
+        json.dump({"size": size, "images": index}, f, indent=2)
+
+
 @save_asset
-def _pacman_open(rotate: int = 0) -> Image.Image:
+def _pacman_open(rotate: int = 0, colour: Colour = (255, 251, 0)) -> Image.Image:
     im = Image.new("RGBA", (50, 50))
     actual_pacman = Image.new("RGBA", (50, 50))
     draw = ImageDraw.Draw(actual_pacman)
-    draw.pieslice(((0.0, 0.0), (50.0, 50.0)), 45, 360 - 45, fill=(255, 251, 0))
+    draw.pieslice(((0.0, 0.0), (50.0, 50.0)), 45, 360 - 45, fill=colour)
     actual_pacman = actual_pacman.rotate(rotate)
 
     actual_pacman = actual_pacman.resize((40, 40))
@@ -28,11 +61,11 @@ def _pacman_open(rotate: int = 0) -> Image.Image:
 
 
 @save_asset
-def _pacman_closed() -> Image.Image:
+def _pacman_closed(colour: Colour = (255, 251, 0)) -> Image.Image:
     im = Image.new("RGBA", (50, 50))
     actual_pacman = Image.new("RGBA", (50, 50))
     draw = ImageDraw.Draw(actual_pacman)
-    draw.ellipse([0, 0, 50, 50], fill=(255, 251, 0))
+    draw.ellipse([0, 0, 50, 50], fill=colour)
     actual_pacman = actual_pacman.resize((40, 40))
     im.paste(actual_pacman, (5, 5))
     return im
@@ -92,27 +125,31 @@ def _scared_ghost(colour: Tuple[int, int, int]) -> Image.Image:
 
 
 @save_asset
-def _wall() -> Image.Image:
+def _wall(
+    outline: Colour = (18, 50, 239), fill: Colour = (13, 34, 161)
+) -> Image.Image:
     im = Image.new("RGBA", (50, 50))
     draw = ImageDraw.Draw(im)
     draw.rounded_rectangle(
         (2.0, 2.0, 48.0, 48.0),
-        outline=(18, 50, 239),
+        outline=outline,
         width=5,
-        fill=(13, 34, 161),
+        fill=fill,
         radius=3,
     )
     return im
 
 
 @save_asset
-def _coin() -> Image.Image:
+def _coin(
+    floor: Colour = (14, 14, 14), colour: Colour = (255, 255, 255)
+) -> Image.Image:
     im = Image.new("RGBA", (50, 50), (0, 0, 0))
     draw = ImageDraw.Draw(im)
-    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=(14, 14, 14), radius=5)
-    coin = Image.new("RGBA", (8, 8), (14, 14, 14))
+    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=floor, radius=5)
+    coin = Image.new("RGBA", (8, 8), floor)
     draw = ImageDraw.Draw(coin)
-    draw.rounded_rectangle((0, 0, 8, 8), fill=(255, 255, 255), radius=1)
+    draw.rounded_rectangle((0, 0, 8, 8), fill=colour, radius=1)
     coin = coin.rotate(45)
 
     im.paste(coin, (21, 21))
@@ -121,43 +158,190 @@ def _coin() -> Image.Image:
 
 
 @save_asset
-def _blank() -> Image.Image:
+def _blank(floor: Colour = (12, 12, 12)) -> Image.Image:
     im = Image.new("RGBA", (50, 50), (0, 0, 0))
     draw = ImageDraw.Draw(im)
-    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=(12, 12, 12), radius=5)
+    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=floor, radius=5)
     return im
 
 
 @save_asset
-def _power_pellet() -> Image.Image:
+def _power_pellet(
+    floor: Colour = (14, 14, 14), colour: Colour = (255, 255, 255)
+) -> Image.Image:
     im = Image.new("RGBA", (50, 50), (0, 0, 0))
     draw = ImageDraw.Draw(im)
-    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=(14, 14, 14), radius=5)
-    coin = Image.new("RGBA", (20, 20), (14, 14, 14))
+    draw.rounded_rectangle((2.0, 2.0, 48.0, 48.0), fill=floor, radius=5)
+    coin = Image.new("RGBA", (20, 20), floor)
     draw = ImageDraw.Draw(coin)
-    draw.ellipse([0, 0, 20, 20], fill=(255, 255, 255))
+    draw.ellipse([0, 0, 20, 20], fill=colour)
 
     im.paste(coin, (15, 15))
 
     return im
 
 
-if __name__ == "__main__":
-    # automatically save all the images if we run the file
-
-    _pacman_open(filename="pacman_open_right.png")
-    _pacman_open(180, filename="pacman_open_left.png")
-    _pacman_open(270, filename="pacman_open_down.png")
-    _pacman_open(90, filename="pacman_open_up.png")
-
-    _pacman_closed(filename="pacman_closed.png")
+THEMES: Dict[str, Dict[str, Colour]] = {
+    "classic": {
+        "pacman": (255, 251, 0),
+        "ghost_red": (255, 49, 0),
+        "ghost_orange": (255, 204, 0),
+        "ghost_blue": (0, 252, 255),
+        "ghost_pink": (254, 171, 210),
+        "wall_outline": (18, 50, 239),
+        "wall_fill": (13, 34, 161),
+        "floor": (12, 12, 12),
+        "coin_floor": (14, 14, 14),
+        "coin": (255, 255, 255),
+    }
+}
+
+
+def asset_list(theme: Dict[str, Colour]) -> Dict[str, Tuple[str, tuple]]:
+    # asset name -> the function that draws it and what to pass it
+    return {
+        "pacman_open_right": ("_pacman_open", (0, theme["pacman"])),
+        "pacman_open_left": ("_pacman_open", (180, theme["pacman"])),
+        "pacman_open_down": ("_pacman_open", (270, theme["pacman"])),
+        "pacman_open_up": ("_pacman_open", (90, theme["pacman"])),
+        "pacman_closed": ("_pacman_closed", (theme["pacman"],)),
+        "ghost_red": ("_ghost", (theme["ghost_red"],)),
+        "ghost_orange": ("_ghost", (theme["ghost_orange"],)),
+        "ghost_blue": ("_ghost", (theme["ghost_blue"],)),
+        "ghost_pink": ("_ghost", (theme["ghost_pink"],)),
+        "wall": ("_wall", (theme["wall_outline"], theme["wall_fill"])),
+        "coin": ("_coin", (theme["coin_floor"], theme["coin"])),
+        "blank": ("_blank", (theme["floor"],)),
+        "power_pellet": ("_power_pellet", (theme["coin_floor"], theme["coin"])),
+    }
+
+
+def asset_hash(func: str, args: tuple, size: int) -> str:
+    # the drawing code is part of the hash so changing it redraws the asset
+    source = inspect.getsource(save_asset) + inspect.getsource(
+        globals()[func].__wrapped__
+    )
+    return hashlib.sha1(repr((func, args, size, source)).encode()).hexdigest()
+
+
+def draw_asset(func: str, args: tuple, size: int, filename: str) -> None:
+    globals()[func](*args, filename=filename, size=size)
+
+
+def draw_atlas(names: List[str], size: int, directory: str) -> None:
+    images = dict()
+    for name in names:
+        with Image.open(ASSETS + directory + name + ".png") as im:
+            images[name] = im.copy()
+    save_atlas(images, size, directory)
+
+
+def generate(
+    sizes: List[int], themes: Dict[str, Dict[str, Colour]], force: bool, jobs: int
+) -> Dict[str, dict]:
+    try:
+        with open(ASSETS + "manifest.json") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = dict()
+
+    def stale(filename: str, digest: str) -> bool:
+        return (
+            force
+            or manifest.get(filename, {}).get("hash") != digest
+            or not os.path.exists(ASSETS + filename)
+        )
+
+    produced = dict()
+    drawn = 0
+    atlases = []
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = []
+        for theme_name, theme in themes.items():
+            for size in sizes:
+                # the default set stays where the game looks for it
+                directory = ""
+                if (theme_name, size) != ("classic", 24):
+                    directory = "{0}/{1}/".format(theme_name, size)
+                    os.makedirs(ASSETS + directory, exist_ok=True)
+
+                hashes = []
+                for name, (func, args) in asset_list(theme).items():
+                    filename = directory + name + ".png"
+                    digest = asset_hash(func, args, size)
+                    hashes.append(digest)
+                    produced[filename] = {
+                        "hash": digest,
+                        "theme": theme_name,
+                        "size": size,
+                    }
+                    if stale(filename, digest):
+                        futures.append(
+                            pool.submit(draw_asset, func, args, size, filename)
+                        )
+                        drawn += 1
+
+                digest = hashlib.sha1("".join(hashes).encode()).hexdigest()
+                produced[directory + "atlas.png"] = {
+                    "hash": digest,
+                    "theme": theme_name,
+                    "size": size,
+                }
+                if stale(directory + "atlas.png", digest):
+                    atlases.append((list(asset_list(theme)), size, directory))
+
+        for future in futures:
+            future.result()
+        # the atlases need their images finished first
+        futures = [pool.submit(draw_atlas, *atlas) for atlas in atlases]
+        for future in futures:
+            future.result()
+
+    manifest.update(produced)
+    with open(ASSETS + "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(
+        "drew {0} assets and {1} atlases, {2} were already up to date".format(
+            drawn, len(atlases), len(produced) - drawn - len(atlases)
+        )
+    )
+    return produced
 
-    _ghost((255, 49, 0), filename="ghost_red.png")
-    _ghost((255, 204, 0), filename="ghost_orange.png")
-    _ghost((0, 252, 255), filename="ghost_blue.png")
-    _ghost((254, 171, 210), filename="ghost_pink.png")
 
-    _wall(filename="wall.png")
-    _coin(filename="coin.png")
-    _blank(filename="blank.png")
-    _power_pellet(filename="power_pellet.png")
+if __name__ == "__main__":
+    # automatically save all the images if we run the file
+    parser = argparse.ArgumentParser(prog="images")
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[24],
+        help="comma separated tile sizes to draw everything at (default 24)",
+    )
+    parser.add_argument(
+        "--themes",
+        type=lambda value: value.split(","),
+        default=["classic"],
+        help="comma separated colour themes to draw (default classic)",
+    )
+    parser.add_argument(
+        "--theme-file",
+        help="json file of extra themes, each one a name mapped to the same "
+        "colours as the classic theme",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="redraw everything even if it's up to date"
+    )
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.theme_file:
+        with open(args.theme_file) as f:
+            for name, theme in json.load(f).items():
+                THEMES[name] = {role: tuple(colour) for role, colour in theme.items()}
+
+    generate(
+        args.sizes,
+        {name: THEMES[name] for name in args.themes},
+        args.force,
+        args.jobs,
+    )
@@ -0,0 +1,221 @@
+import argparse
+from collections import deque
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, List
+
+from board import BITS, OFFSETS, SPAWNS, Board, parse_board
+from enums import Tile
+
+LEVELS = "../levels/"
+CATALOG = "catalog.json"
+
+# magic, format version, width, height, number of coins, then a byte per tile
+# row by row and the tile each of SPAWNS starts on. unlike the path tables
+# these get shared, so they're always little endian
+HEADER = struct.Struct("<4sBHHI")
+SPAWN = struct.Struct("<HH")
+MAGIC = b"PLVL"
+VERSION = 2
+
+
+def validate(data: str) -> List[str]:
+    # everything wrong with a level, nothing if it's fine to play
+    rows = data.rstrip("\n").split("\n")
+    problems = []
+    if len({len(row) for row in rows}) != 1:
+        problems.append("the rows aren't all the same length")
+    # unknown tiles and boards with nowhere open to start can't be parsed
+    try:
+        board = parse_board(data)
+    except ValueError as error:
+        return problems + [str(error)]
+
+    last_x, last_y = board.width - 1, board.height - 1
+    gaps = [
+        (x, y)
+        for y in range(board.height)
+        for x in range(board.width)
+        if (x in (0, last_x) or y in (0, last_y)) and board.get(x, y) != Tile.WALL
+    ]
+    if gaps:
+        problems.append("the edge isn't all wall, {0}, {1} is open".format(*gaps[0]))
+
+    x, y = board.spawns["pacman"]
+    # flood out from where pacman starts, any coin it doesn't get to can
+    # never be eaten so the level can never be won
+    steps = [(BITS[d], dy * board.width + dx) for d, (dx, dy) in OFFSETS.items()]
+    start = y * board.width + x
+    seen = bytearray(len(board.tiles))
+    seen[start] = 1
+    queue = deque([start])
+    while queue:
+        index = queue.popleft()
+        mask = board.open[index]
+        for bit, step in steps:
+            if mask & bit and not seen[index + step]:
+                seen[index + step] = 1
+                queue.append(index + step)
+
+    stranded = sum(
+        1
+        for index, item in enumerate(board.tiles)
+        if item == Tile.COIN.value and not seen[index]
+    )
+    if stranded:
+        problems.append("{0} coins can't be reached".format(stranded))
+    return problems
+
+
+def compile_level(board: Board, path: str) -> None:
+    with open(path + ".tmp", "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, VERSION, board.width, board.height, board.counts[Tile.COIN]
+            )
+        )
+        f.write(board.tiles)
+        for name in SPAWNS:
+            f.write(SPAWN.pack(*board.spawns[name]))
+    os.replace(path + ".tmp", path)
+
+
+def load_level(path: str) -> Board:
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        magic, version, width, height, _ = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("'{0}' isn't a compiled level".format(path))
+        end = HEADER.size + width * height
+        if len(data) != end + len(SPAWNS) * SPAWN.size:
+            raise ValueError("'{0}' is the wrong size".format(path))
+        spawns = {
+            name: SPAWN.unpack_from(data, end + n * SPAWN.size)
+            for n, name in enumerate(SPAWNS)
+        }
+        # the board changes as the coins get eaten so it needs its own copy,
+        # but that's one copy straight out of the page cache
+        return Board(width, height, bytearray(data[HEADER.size : end]), spawns)
+
+
+def read_catalog(directory: str = LEVELS) -> Dict[str, dict]:
+    try:
+        with open(directory + CATALOG) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict()
+
+
+def list_levels(directory: str = LEVELS) -> List[str]:
+    # the catalog's quicker than going through the directory, but boards
+    # that haven't been compiled yet still need to show up
+    names = set(read_catalog(directory))
+    names.update(name[:-6] for name in os.listdir(directory) if name.endswith(".board"))
+    return sorted(names)
+
+
+def open_level(level: str, directory: str = LEVELS) -> Board:
+    # the name of a level or the path to a .board or .level file. compiled
+    # levels are loaded when they're up to date with their .board
+    if os.path.isfile(level):
+        if level.endswith(".level"):
+            return load_level(level)
+        with open(level) as f:
+            return parse_board(f.read())
+
+    source = directory + level + ".board"
+    compiled = directory + level + ".level"
+    if os.path.exists(compiled) and (
+        not os.path.exists(source)
+        or os.path.getmtime(compiled) >= os.path.getmtime(source)
+    ):
+        return load_level(compiled)
+    with open(source) as f:
+        return parse_board(f.read())
+
+
+def compile_levels(
+    sources: List[str], directory: str = LEVELS, force: bool = False
+) -> int:
+    # returns how many of them had problems
+    catalog = read_catalog(directory)
+    failed = 0
+    for source in sources:
+        name = os.path.basename(source)[:-6]
+        compiled = directory + name + ".level"
+        if (
+            not force
+            and name in catalog
+            and os.path.exists(compiled)
+            and os.path.getmtime(compiled) >= os.path.getmtime(source)
+        ):
+            continue
+
+        with open(source) as f:
+            data = f.read()
+        problems = validate(data)
+        if problems:
+            failed += 1
+            for problem in problems:
+                print("{0}: {1}".format(source, problem), file=sys.stderr)
+            continue
+
+        board = parse_board(data)
+        compile_level(board, compiled)
+        catalog[name] = {
+            "width": board.width,
+            "height": board.height,
+            "coins": board.counts[Tile.COIN],
+            "hash": board.digest(),
+        }
+
+    with open(directory + CATALOG + ".tmp", "w") as f:
+        json.dump(dict(sorted(catalog.items())), f, indent=2)
+    os.replace(directory + CATALOG + ".tmp", directory + CATALOG)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="levels",
+        description="check .board files and compile them into levels the game "
+        "can load straight away, keeping catalog.json up to date",
+    )
+    parser.add_argument(
+        "boards", nargs="*", help="the .board files (default all of ../levels/)"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="only check the boards for problems"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="compile them even if they're up to date"
+    )
+    parser.add_argument("--list", action="store_true", help="list the catalog")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, entry in read_catalog().items():
+            print(
+                "{0}: {1}x{2}, {3} coins, {4}".format(
+                    name, entry["width"], entry["height"], entry["coins"], entry["hash"]
+                )
+            )
+        sys.exit(0)
+
+    boards = args.boards or sorted(glob.glob(LEVELS + "*.board"))
+    if args.check:
+        failed = 0
+        for source in boards:
+            with open(source) as f:
+                problems = validate(f.read())
+            failed += bool(problems)
+            for problem in problems:
+                print("{0}: {1}".format(source, problem), file=sys.stderr)
+    else:
+        failed = compile_levels(boards, force=args.force)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+from typing import Callable, Hashable, OrderedDict, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRU(OrderedDict[K, V]):
+    # a dict of the size most recently used things, least recently used
+    # first so that's the one that goes when it's full. get and [] leave
+    # the order alone, only fetch counts as using something
+    def __init__(self, size: int) -> None:
+        super().__init__()
+        self.size: int = size
+
+    def __repr__(self) -> str:
+        return "<LRU cached={0} size={1}>".format(len(self), self.size)
+
+    def fetch(self, key: K, make: Callable[[K], V]) -> V:
+        # the value for key, made by make(key) if it isn't there already
+        try:
+            self.move_to_end(key)
+            return self[key]
+        except KeyError:
+            pass
+
+        value = self[key] = make(key)
+        if len(self) > self.size:
+            self.popitem(last=False)
+        return value
@@ -0,0 +1,239 @@
+from __future__ import annotations
+import contextlib
+import os
+from typing import Optional, TYPE_CHECKING, Tuple
+
+import numpy as np
+
+from board import Board
+from camera import Camera
+from enums import Tile
+
+if TYPE_CHECKING:
+    from game import Game
+    from render import Background
+
+# in TileGrid, on top of the tile values
+PACMAN = len(Tile)
+GHOST = len(Tile) + 1
+# one plane each in TilePlanes, in this order. the sprites' planes start at
+# pacman's
+PLANES = ("walls", "coins", "pellets", "pacman", "blinky", "pinky", "clyde", "inky")
+WALLS, COINS, PELLETS, SPRITES = range(4)
+GHOSTS = {name: PLANES.index(name) for name in PLANES[4:]}
+PLANE_TILES = ((WALLS, Tile.WALL), (COINS, Tile.COIN), (PELLETS, Tile.POWER_PELLET))
+
+
+def check_buffer(
+    buffer: Optional[np.ndarray], shape: Tuple[int, ...], dtype: type
+) -> np.ndarray:
+    # the array to fill in observations, a new one if there isn't one
+    if buffer is None:
+        return np.zeros(shape, dtype)
+    if buffer.shape != shape or buffer.dtype != dtype:
+        raise ValueError(
+            "observations need a {0} array of {1}, not {2} of {3}".format(
+                shape, np.dtype(dtype), buffer.shape, buffer.dtype
+            )
+        )
+    if not buffer.flags.c_contiguous:
+        raise ValueError("observations need a contiguous array")
+    return buffer
+
+
+class TileGrid:
+    # the tiles as one height x width grid, with pacman and the ghosts over
+    # the top on the tiles they're mostly on. filled in the same way as the
+    # planes below
+    def __init__(
+        self, width: int, height: int, buffer: Optional[np.ndarray] = None
+    ) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.buffer: np.ndarray = check_buffer(buffer, (height, width), np.uint8)
+        self.grid: np.ndarray = self.view(self.buffer)
+
+    def __repr__(self) -> str:
+        return "<TileGrid width={0} height={1}>".format(self.width, self.height)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.grid.shape
+
+    @staticmethod
+    def view(buffer: np.ndarray) -> np.ndarray:
+        return buffer
+
+    def __call__(self, game: Game) -> np.ndarray:
+        board, grid = game.board, self.grid
+        np.copyto(grid.reshape(-1), np.frombuffer(board.tiles, np.uint8))
+        for name, sprite in game.sprites.items():
+            x, y = (sprite.x + 12) // 24, (sprite.y - 12) // 24
+            if board.inside(x, y):
+                grid[y, x] = PACMAN if name == "pacman" else GHOST
+        swarm = game.swarm
+        if swarm is not None:
+            x, y = (swarm.x + 12) // 24, (swarm.y - 12) // 24
+            inside = (0 <= x) & (x < board.width) & (0 <= y) & (y < board.height)
+            grid[y[inside], x[inside]] = GHOST
+        return grid
+
+
+class TilePlanes:
+    # the game as a stack of height x width planes with a 1 wherever there's
+    # one of the thing the plane is for, worked out from the board and the
+    # sprites without drawing anything. the same array is filled in every
+    # time, so copy it if it needs to outlive the next call. it fills in
+    # buffer if it's given one, so a lot of them can share one big array
+    def __init__(
+        self, width: int, height: int, buffer: Optional[np.ndarray] = None
+    ) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.buffer: np.ndarray = check_buffer(
+            buffer, (len(PLANES), height, width), np.uint8
+        )
+        self.planes: np.ndarray = self.view(self.buffer)
+        # the board's tiles as an array without copying them, only made again
+        # when they're different tiles
+        self.source: Optional[bytearray] = None
+        self.tiles: np.ndarray = np.zeros((height, width), np.uint8)
+        # for working out which tiles a swarm is on
+        self.swarm_x: np.ndarray = np.zeros(0, np.int64)
+        self.swarm_y: np.ndarray = np.zeros(0, np.int64)
+        self.swarm_planes: np.ndarray = np.zeros(0, np.int64)
+
+    def __repr__(self) -> str:
+        return "<TilePlanes width={0} height={1}>".format(self.width, self.height)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.planes.shape
+
+    @staticmethod
+    def view(buffer: np.ndarray) -> np.ndarray:
+        return buffer
+
+    def __call__(self, game: Game) -> np.ndarray:
+        board, planes = game.board, self.planes
+        if board.tiles is not self.source:
+            if (board.width, board.height) != (self.width, self.height):
+                raise ValueError(
+                    "{0!r} isn't {1}x{2}".format(board, self.width, self.height)
+                )
+            self.source = board.tiles
+            self.tiles = np.frombuffer(board.tiles, np.uint8).reshape(
+                board.height, board.width
+            )
+
+        for plane, tile in PLANE_TILES:
+            np.equal(self.tiles, tile.value, out=planes[plane], casting="unsafe")
+
+        planes[SPRITES:] = 0
+        for name, sprite in game.sprites.items():
+            # the tile they're mostly on
+            x, y = (sprite.x + 12) // 24, (sprite.y - 12) // 24
+            if board.inside(x, y):
+                planes[GHOSTS.get(name, SPRITES), y, x] = 1
+
+        swarm = game.swarm
+        if swarm is not None:
+            if len(self.swarm_planes) != len(swarm.kinds):
+                self.swarm_x = np.zeros(len(swarm.kinds), np.int64)
+                self.swarm_y = np.zeros(len(swarm.kinds), np.int64)
+                self.swarm_planes = swarm.kinds + GHOSTS["blinky"]
+            x, y = self.swarm_x, self.swarm_y
+            np.add(swarm.x, 12, out=x)
+            np.floor_divide(x, 24, out=x)
+            np.subtract(swarm.y, 12, out=y)
+            np.floor_divide(y, 24, out=y)
+            # ghosts only ever leave the board through a tunnel, and only
+            # for a tick or two, so it's cheaper to clip them than index
+            # out the ones that have
+            np.clip(x, 0, self.width - 1, out=x)
+            np.clip(y, 0, self.height - 1, out=y)
+            planes[self.swarm_planes, y, x] = 1
+        return planes
+
+
+class PixelView:
+    # the game drawn the way the window draws it, into a surface whose pixels
+    # are a numpy array, so reading them doesn't copy anything. the array is
+    # height x width x 3 and gets drawn over every call, the same as the
+    # planes. it needs pygame, and opens a dummy display if there isn't one
+    # since the background and the images have to match a display's format.
+    # like the planes, buffer is what to draw into if it's given, here a
+    # height x width x 4 array
+    def __init__(
+        self, width: int, height: int, buffer: Optional[np.ndarray] = None
+    ) -> None:
+        # only imported when it's wanted, the planes don't need pygame
+        with contextlib.redirect_stdout(None):
+            import pygame
+
+        from assets import assets
+
+        if pygame.display.get_surface() is None:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            pygame.display.init()
+            pygame.display.set_mode((1, 1))
+            assets.convert()
+
+        self.width: int = width
+        self.height: int = height
+        # surfarray.pixels3d would lock the surface for as long as the array
+        # was around, and nothing can be blitted onto a locked surface, so
+        # the surface is made over the array instead
+        self.buffer: np.ndarray = check_buffer(buffer, (height, width, 4), np.uint8)
+        self.surface: pygame.Surface = pygame.image.frombuffer(
+            self.buffer.data, (width, height), "RGBX"
+        )
+        self.pixels: np.ndarray = self.view(self.buffer)
+        # the background for the board it was last shown, drawn a chunk at a
+        # time and then kept up to date from game.changed
+        self.board: Optional[Board] = None
+        self.background: Background
+        self.camera: Camera
+
+    def __repr__(self) -> str:
+        return "<PixelView width={0} height={1}>".format(self.width, self.height)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.pixels.shape
+
+    @staticmethod
+    def view(buffer: np.ndarray) -> np.ndarray:
+        # the pixels in buffer, or in a stack of them, without the padding
+        return buffer[..., :3]
+
+    def __call__(self, game: Game) -> np.ndarray:
+        from assets import assets
+        from render import Background
+
+        board = game.board
+        if board is not self.board:
+            self.board = board
+            self.background = Background(board)
+            self.camera = Camera(
+                self.width, self.height, board.width * 24, board.height * 24 + 24
+            )
+        background, camera = self.background, self.camera
+        for pos in game.changed:
+            background.repaint(*pos)
+
+        pacman = game.get_sprite("pacman")
+        camera.follow(pacman.x, pacman.y)
+        surface = self.surface
+        background.draw(surface, camera)
+        for sprite in game.sprites.values():
+            if sprite is pacman and (pacman.dead or pacman.won):
+                continue
+            if camera.visible(sprite.x, sprite.y):
+                surface.blit(
+                    assets[sprite.image], (sprite.x - camera.x, sprite.y - camera.y)
+                )
+        if game.swarm is not None:
+            for image, x, y in game.swarm.visible(1.0, camera.rect):
+                surface.blit(assets[image], (x - camera.x, y - camera.y))
+        return self.pixels
@@ -1,35 +1,53 @@
-import contextlib
-from typing import Tuple, List
-import time
+from typing import Any, Tuple
 
-with contextlib.redirect_stdout(None):
-    import pygame
-
-from sprite import Sprite
+from board import BITS, Board
+from sprite import Sprite, spawn_point
 from enums import Tile, Direction
 
-TB = List[List[Tile]]
 PACMAN_SPEED = 3
-
-pygame.font.init()
-font = pygame.font.SysFont("Font.ttf", 24)
-bigfont = pygame.font.SysFont("Font.ttf", 72)
-
-
-def load(file: str) -> pygame.Surface:
-    path = "../assets/" + file + ".png"
-    return pygame.image.load(path)
-
-
-PACMAN_OPEN_RIGHT = load("pacman_open_right")
-PACMAN_OPEN_LEFT = load("pacman_open_left")
-PACMAN_OPEN_DOWN = load("pacman_open_down")
-PACMAN_OPEN_UP = load("pacman_open_up")
-PACMAN_CLOSED = load("pacman_closed")
+# how close sprites have to get to each other to touch, and how far one can
+# go in a tick before it counts as being sent somewhere rather than moving
+REACH = 3
+MAX_STEP = 24
+
+
+def swept_overlap(
+    a0: Tuple[int, int],
+    a1: Tuple[int, int],
+    b0: Tuple[int, int],
+    b1: Tuple[int, int],
+) -> bool:
+    # whether two sprites going in straight lines from a0 to a1 and b0 to b1
+    # over the same tick were ever within REACH of each other on both axes at
+    # once. each axis gives the part of the tick they're close on that axis,
+    # and they touched if those overlap
+    low, high = float("-inf"), float("inf")
+    for axis in (0, 1):
+        start = a0[axis] - b0[axis]
+        change = (a1[axis] - a0[axis]) - (b1[axis] - b0[axis])
+        if not change:
+            if abs(start) >= REACH:
+                return False
+            continue
+        first, second = (-REACH - start) / change, (REACH - start) / change
+        low = max(low, min(first, second))
+        high = min(high, max(first, second))
+    return low < high and low < 1 and high > 0
 
 
 class PacmanSprite(Sprite):
-    def __init__(self, app):
+    __slots__ = (
+        "current_direction",
+        "next_direction",
+        "score",
+        "won",
+        "dead",
+        "lives",
+        "start_time",
+        "start",
+    )
+
+    def __init__(self, game):
         self.current_direction: Direction = Direction.NONE
         self.next_direction: Direction = Direction.NONE
         self.score: int = 0
@@ -37,43 +55,37 @@ class PacmanSprite(Sprite):
         self.dead = False
         self.lives = 3
 
-        self.start_time = time.time()
+        self.start_time = game.time
+        self.start: Tuple[int, int] = spawn_point(game, "pacman")
+
+        super().__init__(game, "pacman_open_right", self.start)
 
-        super().__init__(app, app.display, PACMAN_OPEN_RIGHT, (24 * 12, 24 * 12 + 24))
+    @property
+    def time_remaining(self) -> float:
+        return max(100 - (self.game.time - self.start_time), 0)
 
     def check_board(
-        self, direction: Direction, pos: Tuple[int, int], board: TB
+        self, direction: Direction, pos: Tuple[int, int], board: Board
     ) -> bool:
         if not (pos[0] % 24 == 0 and pos[1] % 24 == 0):
             return True
-        if direction == Direction.RIGHT:
-            return board[pos[1] // 24][pos[0] // 24 + 1] != Tile.WALL
-        elif direction == Direction.LEFT:
-            return board[pos[1] // 24][pos[0] // 24 - 1] != Tile.WALL
-        elif direction == Direction.DOWN:
-            return board[pos[1] // 24 + 1][pos[0] // 24] != Tile.WALL
-        elif direction == Direction.UP:
-            return board[pos[1] // 24 - 1][pos[0] // 24] != Tile.WALL
-        elif direction == Direction.NONE:
+        if direction == Direction.NONE:
             return True
+        return bool(board.opens(pos[0] // 24, pos[1] // 24) & BITS[direction])
 
-    def eat_coin(self, b: TB) -> TB:
-        x, y = self.position
+    def eat_coin(self, b: Board) -> Board:
+        x, y = self.x, self.y
         y -= 24
 
-        current = b[y // 24][x // 24]
+        current = b.get(x // 24, y // 24)
         if current == Tile.COIN:
             self.score += 10
-            b[y // 24][x // 24] = Tile.BLANK
-
-            def check() -> bool:
-                nonlocal b
-                flattened: List[Tile] = [item for sublist in b for item in sublist]
-                return Tile.COIN not in flattened
+            b.set(x // 24, y // 24, Tile.BLANK)
+            self.game.changed.append((x // 24, y // 24))
 
-            if check():
+            if not b.counts[Tile.COIN]:
                 self.won = True
-                self.score += round((100 - (time.time() - self.start_time)) * 50)
+                self.score += round(self.time_remaining * 50)
                 self.score += self.lives * 500
 
         return b
@@ -88,84 +100,88 @@ class PacmanSprite(Sprite):
         }
         return inverse_dict[directions[0]] == directions[1]
 
-    def render(self, img, pos):
-        x, y = pos
-        super().update(img, (x, y))
-
-        if (time_remaining := 100 - (time.time() - self.start_time)) <= 0:
-            time_remaining = 0
-            self.dead = True
+    def collide(self) -> None:
+        # run once everything has moved, checking the whole of this tick's
+        # movement rather than only where everyone ended up so that nothing
+        # can pass straight through pacman however far it goes in a tick
+        if self.dead or self.won:
+            return
 
-        coins_remaining = len(
-            [
-                item
-                for sublist in self.app.board
-                for item in sublist
-                if item == Tile.COIN
-            ]
+        start, end = self.previous, self.position
+        reach = MAX_STEP + REACH
+        nearby = self.game.space.within(
+            min(start[0], end[0]) - reach,
+            min(start[1], end[1]) - reach,
+            max(start[0], end[0]) + reach,
+            max(start[1], end[1]) + reach,
         )
+        for sprite in nearby:
+            if sprite is self:
+                continue
+            before, after = sprite.previous, sprite.position
+            if max(abs(after[0] - before[0]), abs(after[1] - before[1])) > MAX_STEP:
+                before = after
+            if swept_overlap(start, end, before, after):
+                break
+        else:
+            swarm = self.game.swarm
+            if swarm is None or not swarm.touching(start, end):
+                return
 
-        for i in range(self.lives):
-            self.app.display.blit(PACMAN_OPEN_RIGHT, ((576 - i * 24) - 24, 0))
-
-        surf = font.render(
-            "Score: "
-            + str(self.score)
-            + "    Time: "
-            + str(round(time_remaining))
-            + "    Coins: "
-            + str(coins_remaining),
-            True,
-            (255, 255, 255),
+        # collision detection 👍
+        self.lives -= 1
+        if self.lives <= 0:
+            self.dead = True
+        self.move("pacman_open_right", self.start)
+
+        for sprite in self.game.sprites.values():
+            if sprite is not self:
+                sprite.reset()
+        if self.game.swarm is not None:
+            self.game.swarm.reset()
+
+    def save(self) -> Tuple[Any, ...]:
+        return (
+            super().save(),
+            self.current_direction,
+            self.next_direction,
+            self.score,
+            self.won,
+            self.dead,
+            self.lives,
         )
-        self.app.display.blit(surf, (5, 5))
 
-    def update(self) -> None:
+    def load(self, state: Tuple[Any, ...]) -> None:
+        (
+            sprite,
+            self.current_direction,
+            self.next_direction,
+            self.score,
+            self.won,
+            self.dead,
+            self.lives,
+        ) = state
+        super().load(sprite)
 
+    def update(self) -> None:
         if self.dead or self.won:
-            surf = font.render("Score: " + str(self.score), True, (255, 255, 255))
-            self.app.display.blit(surf, (5, 5))
-
-            text = "You won!" if self.won else "You died!"
-            colour = (255, 255, 255) if self.won else (255, 0, 0)
-            surf = bigfont.render(text, True, colour)
-            self.app.display.blit(surf, (185, 200))
             return
 
-        for sprite in self.app.sprites:
-            if sprite == "pacman":
-                continue
-            gx, gy = self.app.sprites[sprite].position
-            px, py = self.position
-            if gx - 3 < px < gx + 3 and gy - 3 < py < gy + 3:
-                # collision detection 👍
-                self.lives -= 1
-                if self.lives <= 0:
-                    self.dead = True
-                self.render(PACMAN_OPEN_RIGHT, (24 * 12, 24 * 12 + 24))
-
-                for sprite in self.app.sprites:
-                    if sprite == "pacman":
-                        continue
-                    self.app.sprites[sprite]._position = self.app.sprites[
-                        sprite
-                    ].starting_position
-
-        x, y = self.position
+        x, y = self.x, self.y
         y -= 24
 
         if (x % 24 == 0 and y % 24 == 0) or self.isinverse(
             (self.current_direction, self.next_direction)
         ):
             direction = self.next_direction
-            if not self.check_board(self.next_direction, (x, y), self.app.board):
+            if not self.check_board(self.next_direction, (x, y), self.game.board):
                 direction = self.current_direction
-            if not self.check_board(self.current_direction, (x, y), self.app.board):
+            if not self.check_board(self.current_direction, (x, y), self.game.board):
                 direction = Direction.NONE
 
             self.current_direction = direction
             if x % 24 == 0 and y % 24 == 0:
-                self.app.board = self.eat_coin(self.app.board)
+                self.game.board = self.eat_coin(self.game.board)
         else:
             direction = self.current_direction
 
@@ -174,18 +190,21 @@ class PacmanSprite(Sprite):
         y += 24
         if direction == Direction.RIGHT:
             x += PACMAN_SPEED
-            img = PACMAN_OPEN_RIGHT
+            img = "pacman_open_right"
         elif direction == Direction.LEFT:
             x -= PACMAN_SPEED
-            img = PACMAN_OPEN_LEFT
+            img = "pacman_open_left"
         elif direction == Direction.UP:
             y -= PACMAN_SPEED
-            img = PACMAN_OPEN_UP
+            img = "pacman_open_up"
         elif direction == Direction.DOWN:
             y += PACMAN_SPEED
-            img = PACMAN_OPEN_DOWN
+            img = "pacman_open_down"
 
         if x % 24 > 12 or y % 24 > 12:
-            img = PACMAN_CLOSED
+            img = "pacman_closed"
+
+        self.move(img, (x, y))
 
-        self.render(img, (x, y))
+        if self.time_remaining <= 0:
+            self.dead = True
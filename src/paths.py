@@ -0,0 +1,275 @@
+from __future__ import annotations
+from array import array
+from collections import deque
+import mmap
+import os
+import struct
+import sys
+from typing import BinaryIO, Iterable, Optional, Union
+
+from board import BITS, OFFSETS, Board
+from enums import Direction, Tile
+from ghost import DIRECTIONS
+from lru import LRU
+
+UNREACHABLE = 0xFFFF
+CACHE = "../cache/"
+
+# magic, format version, width, height, number of walkable tiles. the tables
+# only ever live in the local cache so everything is in native byte order
+HEADER = struct.Struct("=4sBHHI")
+MAGIC = b"PTBL"
+VERSION = 4
+# tables grow with the square of the walkable tiles, this many takes a second
+# or two to build and a few megabytes. anything bigger path finds with
+# DistanceFields instead
+MAX_TABLE_TILES = 1024
+HOPS = {bit: direction for direction, bit in BITS.items()}
+
+
+def nearest_walkable(board: Board) -> array:
+    # tile index -> the index of the closest tile that isn't a wall, which is
+    # itself for anything that isn't a wall. targets are often in walls, two
+    # tiles past a dead end say, and going for the nearest open tile to them
+    # is as close as a ghost can get. it's a search out from every open tile
+    # at once, so it goes through each tile once however many walls there
+    # are
+    nearest = array("i", [-1]) * len(board.tiles)
+    queue = deque()
+    for index, item in enumerate(board.tiles):
+        if item != Tile.WALL.value:
+            nearest[index] = index
+            queue.append(index)
+
+    width = board.width
+    while queue:
+        index = queue.popleft()
+        x, y = index % width, index // width
+        for dx, dy in OFFSETS.values():
+            if board.inside(x + dx, y + dy):
+                step = index + dy * width + dx
+                if nearest[step] < 0:
+                    nearest[step] = nearest[index]
+                    queue.append(step)
+    return nearest
+
+
+class DistanceFields:
+    def __init__(self, board: Board, size: int = 64) -> None:
+        self.board: Board = board
+        # target tile index -> distance from every tile to that target
+        self.fields: LRU[int, array] = LRU(size)
+        # targets in walls are searched from the nearest open tile instead,
+        # the same as in the path tables
+        self.nearest: array = nearest_walkable(board)
+
+    def __repr__(self) -> str:
+        return "<DistanceFields cached={0} size={1}>".format(
+            len(self.fields), self.fields.size
+        )
+
+    def get(self, x: int, y: int) -> array:
+        board = self.board
+        x = min(max(x, 0), board.width - 1)
+        y = min(max(y, 0), board.height - 1)
+        return self.fields.fetch(self.nearest[y * board.width + x], self._search)
+
+    def _search(self, target: int) -> array:
+        board = self.board
+        field = array("H", [UNREACHABLE]) * len(board.tiles)
+        field[target] = 0
+        queue = deque((target,))
+        steps = [(BITS[d], dy * board.width + dx) for d, (dx, dy) in OFFSETS.items()]
+
+        while queue:
+            index = queue.popleft()
+            distance = field[index] + 1
+            mask = board.open[index]
+            for bit, step in steps:
+                if mask & bit and field[index + step] == UNREACHABLE:
+                    field[index + step] = distance
+                    queue.append(index + step)
+        return field
+
+    def distance(self, x: int, y: int, tx: int, ty: int) -> Optional[int]:
+        distance = self.get(tx, ty)[y * self.board.width + x]
+        return None if distance == UNREACHABLE else distance
+
+    def best(
+        self, x: int, y: int, tx: int, ty: int, directions: Iterable[Direction]
+    ) -> Optional[Direction]:
+        field = self.get(tx, ty)
+        width = self.board.width
+        best, best_distance = None, UNREACHABLE
+        for direction in directions:
+            dx, dy = OFFSETS[direction]
+            distance = field[(y + dy) * width + x + dx]
+            if distance < best_distance:
+                best, best_distance = direction, distance
+        return best
+
+
+class PathTable:
+    # every walkable tile to every other walkable tile, see build_path_table
+    # for the layout of the file this reads
+    def __init__(self, file: BinaryIO) -> None:
+        self.file: BinaryIO = file
+        self.map: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.width, self.height, self.count = HEADER.unpack_from(
+            self.map
+        )
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError("'{0}' isn't a path table".format(file.name))
+
+        view = memoryview(self.map)
+        start = HEADER.size
+        end = start + self.width * self.height * 4
+        # tile index -> walkable index, of the nearest walkable tile for walls
+        self.index = view[start:end].cast("i")
+
+        start, end = end, end + self.count * self.count * 2
+        self.distances = view[start:end].cast("H")
+
+        start, end = end, end + self.count * self.count
+        # the bit of the direction to go from one tile to get to the other
+        self.hops = view[start:end]
+
+    def __repr__(self) -> str:
+        return "<PathTable width={0} height={1} tiles={2}>".format(
+            self.width, self.height, self.count
+        )
+
+    def _lookup(self, x: int, y: int) -> int:
+        # anywhere off the board is the closest tile on it, like
+        # DistanceFields.get
+        x = min(max(x, 0), self.width - 1)
+        y = min(max(y, 0), self.height - 1)
+        return self.index[y * self.width + x]
+
+    def distance(self, x: int, y: int, tx: int, ty: int) -> Optional[int]:
+        start, target = self._lookup(x, y), self._lookup(tx, ty)
+        distance = self.distances[start * self.count + target]
+        return None if distance == UNREACHABLE else distance
+
+    def best(
+        self, x: int, y: int, tx: int, ty: int, directions: Iterable[Direction]
+    ) -> Optional[Direction]:
+        start, target = self._lookup(x, y), self._lookup(tx, ty)
+        hop = HOPS.get(self.hops[start * self.count + target])
+        directions = list(directions)
+        if hop in directions:
+            return hop
+
+        # the shortest way is back the way the ghost came, so go with the
+        # best of the rest
+        best, best_distance = None, UNREACHABLE
+        for direction in directions:
+            dx, dy = OFFSETS[direction]
+            distance = self.distance(x + dx, y + dy, tx, ty)
+            if distance is not None and distance < best_distance:
+                best, best_distance = direction, distance
+        return best
+
+
+def build_path_table(board: Board, path: str) -> None:
+    # header, then an int per tile mapping it to its walkable index (or the
+    # nearest walkable tile's), then count * count unsigned shorts of
+    # distances and count * count bytes of next hops, both indexed by
+    # [from * count + to]
+    walkable = [i for i, item in enumerate(board.tiles) if item != Tile.WALL.value]
+    count = len(walkable)
+    if count > MAX_TABLE_TILES:
+        raise ValueError(
+            "{0} walkable tiles is too many for a path table, the most is {1}".format(
+                count, MAX_TABLE_TILES
+            )
+        )
+    index = array("i", [-1]) * len(board.tiles)
+    for n, i in enumerate(walkable):
+        index[i] = n
+    for i, nearest in enumerate(nearest_walkable(board)):
+        index[i] = index[nearest]
+
+    fields = DistanceFields(board, size=1)
+    # the hop is the first shortest way in the order the ghosts break ties
+    # in, so the table sends them the same way DistanceFields.best does
+    steps = [
+        (BITS[d], OFFSETS[d][1] * board.width + OFFSETS[d][0]) for d in DIRECTIONS
+    ]
+    distances = array("H", [UNREACHABLE]) * (count * count)
+    hops = bytearray(count * count)
+    for to, target in enumerate(walkable):
+        field = fields._search(target)
+        for n, i in enumerate(walkable):
+            distance = field[i]
+            distances[n * count + to] = distance
+            if distance == UNREACHABLE or distance == 0:
+                continue
+            mask = board.open[i]
+            for bit, step in steps:
+                if mask & bit and field[i + step] == distance - 1:
+                    hops[n * count + to] = bit
+                    break
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, board.width, board.height, count))
+        f.write(index.tobytes())
+        f.write(distances.tobytes())
+        f.write(hops)
+    os.replace(path + ".tmp", path)
+
+
+def walkable_tiles(board: Board) -> int:
+    return len(board.tiles) - board.counts[Tile.WALL]
+
+
+def table_fits(board: Board) -> bool:
+    return walkable_tiles(board) <= MAX_TABLE_TILES
+
+
+def check_swarm_paths(kind: Optional[str], board: Board) -> None:
+    # ghost swarms look everything up in the path table at once, so they
+    # can't path find with bfs or on boards too big for a table
+    if kind == "bfs":
+        raise ValueError("ghost swarms can only path find with a path table")
+    if kind == "table" and not table_fits(board):
+        raise ValueError(
+            "{0} walkable tiles is too many for the path table ghost swarms "
+            "need, the most is {1}".format(walkable_tiles(board), MAX_TABLE_TILES)
+        )
+
+
+def load_path_table(board: Board) -> PathTable:
+    # keyed by the level's layout so editing a level gets it a new table
+    path = CACHE + board.digest() + ".paths"
+    if os.path.exists(path):
+        f = open(path, "rb")
+        try:
+            return PathTable(f)
+        except ValueError:
+            # made by an older version, so it gets built again
+            f.close()
+    os.makedirs(CACHE, exist_ok=True)
+    build_path_table(board, path)
+    return PathTable(open(path, "rb"))
+
+
+def load_paths(
+    kind: Optional[str], board: Board
+) -> Optional[Union[DistanceFields, PathTable]]:
+    if kind == "bfs":
+        return DistanceFields(board)
+    elif kind == "table":
+        if table_fits(board):
+            return load_path_table(board)
+        print(
+            "{0} walkable tiles is too many for a path table (the most is {1}), "
+            "path finding with bfs instead".format(
+                walkable_tiles(board), MAX_TABLE_TILES
+            ),
+            file=sys.stderr,
+        )
+        return DistanceFields(board)
+    return None
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from collections import deque
+import contextlib
+import json
+import time
+from typing import Deque, Dict, Iterator, List, Tuple
+
+
+class Profiler:
+    def __init__(self, *, samples: int = 600, events: int = 1_000_000) -> None:
+        # the last few hundred timings of everything, in seconds
+        self.timings: Dict[str, Deque[float]] = dict()
+        self.samples: int = samples
+        # chrome's trace event format, so captures open in about:tracing or
+        # https://ui.perfetto.dev
+        self.events: Deque[dict] = deque(maxlen=events)
+        self.origin: float = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return "<Profiler timings={0} events={1}>".format(
+            len(self.timings), len(self.events)
+        )
+
+    def record(self, name: str, start: float, end: float) -> None:
+        try:
+            timings = self.timings[name]
+        except KeyError:
+            timings = self.timings[name] = deque(maxlen=self.samples)
+        timings.append(end - start)
+
+        self.events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) * 1_000_000,
+                "dur": (end - start) * 1_000_000,
+                "pid": 0,
+                "tid": 0,
+            }
+        )
+
+    @contextlib.contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def percentiles(self, name: str) -> Tuple[float, float, float]:
+        timings = sorted(self.timings.get(name, ()))
+        if not timings:
+            return 0.0, 0.0, 0.0
+        last = len(timings) - 1
+        return (
+            timings[round(last * 0.5)],
+            timings[round(last * 0.95)],
+            timings[round(last * 0.99)],
+        )
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name in sorted(self.timings, key=lambda name: name != "frame"):
+            p50, p95, p99 = self.percentiles(name)
+            lines.append(
+                "{0}: p50 {1:.2f}ms p95 {2:.2f}ms p99 {3:.2f}ms".format(
+                    name, p50 * 1000, p95 * 1000, p99 * 1000
+                )
+            )
+        return lines
+
+    def export(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"traceEvents": list(self.events)}, f)
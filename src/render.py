@@ -0,0 +1,193 @@
+from __future__ import annotations
+import contextlib
+import functools
+from typing import Iterator, Tuple
+
+from assets import assets
+from board import Board
+from camera import Camera
+from enums import Tile
+from lru import LRU
+from pacman import PacmanSprite
+from sprite import Sprite
+from text import TextCache
+
+with contextlib.redirect_stdout(None):
+    import pygame
+
+
+@functools.lru_cache(maxsize=None)
+def font(size: int) -> pygame.font.Font:
+    # made the first time something gets written rather than on import.
+    # SysFont went through every font on the system looking for one that
+    # doesn't exist before falling back to this one anyway
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.Font(None, size)
+
+
+# the hud only really changes a few times a second, so only draw new text
+# when it does
+texts = TextCache()
+
+
+TILE_IMAGES = {Tile.WALL: "wall", Tile.COIN: "coin", Tile.BLANK: "blank"}
+# how many tiles along each side of a chunk of the background
+CHUNK = 16
+CHUNK_PIXELS = CHUNK * 24
+
+
+def render_tile(surface: pygame.Surface, x: int, y: int, item: Tile) -> pygame.Rect:
+    rect = surface.fill((0, 0, 0), (x * 24, y * 24, 24, 24))
+    surface.blit(assets[TILE_IMAGES.get(item, "wall")], rect)
+    return rect
+
+
+class Background:
+    # the board drawn in chunks that are only drawn the first time they come
+    # into view, so however big the board is a frame only ever touches the
+    # few chunks the camera can see. walls never change and coins only ever
+    # go away, so after that they're patched up a tile at a time from the
+    # tilechange event
+    def __init__(self, board: Board, size: int = 64) -> None:
+        self.board: Board = board
+        # (chunk x, chunk y) -> the drawn chunk
+        self.chunks: LRU[Tuple[int, int], pygame.Surface] = LRU(size)
+
+    def __repr__(self) -> str:
+        return "<Background chunks={0} size={1}>".format(
+            len(self.chunks), self.chunks.size
+        )
+
+    def chunk(self, cx: int, cy: int) -> pygame.Surface:
+        return self.chunks.fetch((cx, cy), self._draw_chunk)
+
+    def _draw_chunk(self, key: Tuple[int, int]) -> pygame.Surface:
+        cx, cy = key
+        surface = pygame.Surface((CHUNK_PIXELS, CHUNK_PIXELS)).convert()
+        surface.fill((0, 0, 0))
+        board = self.board
+        for y in range(cy * CHUNK, min((cy + 1) * CHUNK, board.height)):
+            for x in range(cx * CHUNK, min((cx + 1) * CHUNK, board.width)):
+                render_tile(surface, x - cx * CHUNK, y - cy * CHUNK, board.get(x, y))
+        return surface
+
+    def covering(self, rect: pygame.Rect) -> Iterator[Tuple[int, int, pygame.Rect]]:
+        # every chunk that's under rect and where it is. the chunks start a
+        # row down because of the hud
+        left = max(rect.left // CHUNK_PIXELS, 0)
+        right = min((rect.right - 1) // CHUNK_PIXELS, (self.board.width - 1) // CHUNK)
+        top = max((rect.top - 24) // CHUNK_PIXELS, 0)
+        bottom = min(
+            (rect.bottom - 25) // CHUNK_PIXELS, (self.board.height - 1) // CHUNK
+        )
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                x, y = cx * CHUNK_PIXELS, cy * CHUNK_PIXELS + 24
+                yield cx, cy, pygame.Rect(x, y, CHUNK_PIXELS, CHUNK_PIXELS)
+
+    def draw(self, surface: pygame.Surface, camera: Camera) -> None:
+        surface.fill((0, 0, 0))
+        for cx, cy, rect in self.covering(pygame.Rect(camera.rect)):
+            surface.blit(self.chunk(cx, cy), (rect.x - camera.x, rect.y - camera.y))
+
+    def restore(
+        self, surface: pygame.Surface, rect: pygame.Rect, camera: Camera
+    ) -> None:
+        # puts back what's underneath rect, which is on the screen rather
+        # than the board
+        surface.fill((0, 0, 0), rect)
+        area = rect.move(camera.x, camera.y)
+        for cx, cy, chunk_rect in self.covering(area):
+            clip = area.clip(chunk_rect)
+            surface.blit(
+                self.chunk(cx, cy),
+                (clip.x - camera.x, clip.y - camera.y),
+                clip.move(-chunk_rect.x, -chunk_rect.y),
+            )
+
+    def repaint(self, x: int, y: int) -> pygame.Rect:
+        # chunks that haven't been drawn yet will be right when they are
+        surface = self.chunks.get((x // CHUNK, y // CHUNK))
+        if surface is not None:
+            render_tile(surface, x % CHUNK, y % CHUNK, self.board.get(x, y))
+        return pygame.Rect(x * 24, y * 24 + 24, 24, 24)
+
+
+def repaint_tile(app, pos: Tuple[int, int]) -> None:
+    rect = app.background.repaint(*pos)
+    if app.camera.visible(*rect):
+        rect.move_ip(-app.camera.x, -app.camera.y)
+        app.background.restore(app.display, rect, app.camera)
+        app.invalidate(rect)
+
+
+def interpolate(sprite: Sprite, alpha: float) -> Tuple[int, int]:
+    (px, py), x, y = sprite.previous, sprite.x, sprite.y
+    if abs(x - px) <= 24 and abs(y - py) <= 24:
+        # anything further than that has been sent back to the start
+        # rather than moved, so don't draw it sliding across the board
+        x = round(px + (x - px) * alpha)
+        y = round(py + (y - py) * alpha)
+    return x, y
+
+
+def render_sprites(app, alpha: float) -> None:
+    pacman: PacmanSprite = app.game.get_sprite("pacman")
+    camera: Camera = app.camera
+    for sprite in app.game.sprites.values():
+        if sprite is pacman and (pacman.dead or pacman.won):
+            continue
+
+        x, y = interpolate(sprite, alpha)
+        if camera.visible(x, y):
+            app.draw(assets[sprite.image], (x - camera.x, y - camera.y))
+
+    if app.game.swarm is not None:
+        for image, x, y in app.game.swarm.visible(alpha, camera.rect):
+            app.draw(assets[image], (x - camera.x, y - camera.y))
+
+
+def render_hud(app) -> None:
+    pacman: PacmanSprite = app.game.get_sprite("pacman")
+    if pacman.dead or pacman.won:
+        surf = texts.render(font(24), "Score: " + str(pacman.score), (255, 255, 255))
+        app.draw(surf, (5, 5))
+
+        message = "You won!" if pacman.won else "You died!"
+        colour = (255, 255, 255) if pacman.won else (255, 0, 0)
+        surf = texts.render(font(72), message, colour)
+        app.draw(surf, surf.get_rect(midtop=(app.width // 2, app.height // 3)).topleft)
+        return
+
+    for i in range(pacman.lives):
+        app.draw(assets["pacman_open_right"], (app.width - i * 24 - 24, 0))
+
+    surf = texts.render(
+        font(24),
+        "Score: "
+        + str(pacman.score)
+        + "    Time: "
+        + str(round(pacman.time_remaining))
+        + "    Coins: "
+        + str(app.game.board.counts[Tile.COIN]),
+        (255, 255, 255),
+    )
+    app.draw(surf, (5, 5))
+
+
+def render_frame(app, alpha: float) -> None:
+    moved = app.camera.follow(*interpolate(app.game.get_sprite("pacman"), alpha))
+    if app.dirty_rects and not moved:
+        # put back whatever was underneath the sprites and the hud last frame
+        for rect in app.stale:
+            app.background.restore(app.display, rect, app.camera)
+    else:
+        with app.measure("background"):
+            app.background.draw(app.display, app.camera)
+        app.invalidate(app.display.get_rect())
+
+    with app.measure("sprites"):
+        render_sprites(app, alpha)
+    with app.measure("hud"):
+        render_hud(app)
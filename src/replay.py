@@ -0,0 +1,282 @@
+from __future__ import annotations
+import argparse
+import glob
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, TYPE_CHECKING, Tuple, Union
+
+from board import SPAWNS, Board
+from enums import Direction
+from game import Game, TICK_RATE
+from levels import SPAWN, open_level
+from pacman import PacmanSprite
+from paths import load_paths
+
+if TYPE_CHECKING:
+    from paths import DistanceFields, PathTable
+
+    Paths = Optional[Union[DistanceFields, PathTable]]
+
+# magic, format version, tick rate, level hash, path finding, swarm size and
+# how many ticks between checksums, then the level name, then how many ticks
+# there were, how many inputs and how many checksums, then the inputs and
+# the checksums. like the levels they're always little endian
+HEADER = struct.Struct("<4sBH20sBII")
+NAME = struct.Struct("<H")
+COUNTS = struct.Struct("<III")
+# the tick and the direction pacman was told to go
+INPUT = struct.Struct("<IB")
+# the tick and the checksum after it
+CHECK = struct.Struct("<II")
+MAGIC = b"PREC"
+VERSION = 1
+PATHFINDING = (None, "bfs", "table")
+DIRECTIONS = {direction.value: direction for direction in Direction}
+
+
+def level_hash(board: Board) -> bytes:
+    # the layout and where everything starts, which is all there is to a
+    # level that makes a difference to how a game goes
+    spawns = b"".join(SPAWN.pack(*board.spawns[name]) for name in SPAWNS)
+    return hashlib.sha1(bytes.fromhex(board.digest()) + spawns).digest()
+
+
+def checksum(game: Game) -> int:
+    # the tiles and everything about every sprite and ghost, so a replay
+    # that's gone differently stops matching as soon as anything does
+    crc = zlib.crc32(game.board.tiles)
+    for sprite in game.sprites.values():
+        crc = zlib.crc32(repr(sprite.save()).encode(), crc)
+    if game.swarm is not None:
+        for array in game.swarm.save():
+            crc = zlib.crc32(array.tobytes(), crc)
+    return crc
+
+
+class Recording:
+    # the inputs of one game as the tick they happened on and which way
+    # pacman was told to go, along with a checksum of the game every so
+    # often. the clock is the tick count, so that's everything a replay
+    # needs to go exactly the same way
+    def __init__(
+        self,
+        level: str,
+        digest: bytes,
+        pathfinding: Optional[str] = None,
+        swarm: int = 0,
+        every: int = TICK_RATE,
+        tick_rate: int = TICK_RATE,
+    ) -> None:
+        self.level: str = level
+        # level_hash of the level the game started on
+        self.digest: bytes = digest
+        self.pathfinding: Optional[str] = pathfinding
+        self.swarm: int = swarm
+        self.every: int = every
+        self.tick_rate: int = tick_rate
+        self.ticks: int = 0
+        self.inputs: List[Tuple[int, Direction]] = []
+        self.checksums: List[Tuple[int, int]] = []
+
+    def __repr__(self) -> str:
+        return "<Recording level={0!r} ticks={1} inputs={2}>".format(
+            self.level, self.ticks, len(self.inputs)
+        )
+
+    def save(self, path: str) -> None:
+        name = self.level.encode()
+        with open(path + ".tmp", "wb") as f:
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    self.tick_rate,
+                    self.digest,
+                    PATHFINDING.index(self.pathfinding),
+                    self.swarm,
+                    self.every,
+                )
+            )
+            f.write(NAME.pack(len(name)) + name)
+            f.write(COUNTS.pack(self.ticks, len(self.inputs), len(self.checksums)))
+            f.write(b"".join(INPUT.pack(t, d.value) for t, d in self.inputs))
+            f.write(b"".join(CHECK.pack(t, crc) for t, crc in self.checksums))
+        os.replace(path + ".tmp", path)
+
+
+def load_recording(path: str) -> Recording:
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        magic, version, tick_rate, digest, pathfinding, swarm, every = (
+            HEADER.unpack_from(data)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("'{0}' isn't a recording".format(path))
+        (length,) = NAME.unpack_from(data, HEADER.size)
+        offset = HEADER.size + NAME.size
+        level = data[offset : offset + length].decode()
+        offset += length
+        ticks, inputs, checksums = COUNTS.unpack_from(data, offset)
+        offset += COUNTS.size
+
+        recording = Recording(
+            level, digest, PATHFINDING[pathfinding], swarm, every, tick_rate
+        )
+        recording.ticks = ticks
+        recording.inputs = [
+            (tick, DIRECTIONS[value])
+            for tick, value in INPUT.iter_unpack(
+                data[offset : offset + inputs * INPUT.size]
+            )
+        ]
+        offset += inputs * INPUT.size
+        recording.checksums = list(
+            CHECK.iter_unpack(data[offset : offset + checksums * CHECK.size])
+        )
+    except (struct.error, IndexError, KeyError):
+        raise ValueError("'{0}' is cut short or corrupted".format(path)) from None
+    if offset + checksums * CHECK.size != len(data):
+        raise ValueError("'{0}' is the wrong size".format(path))
+    return recording
+
+
+class Recorder:
+    # steps a game in place of Game.step, writing down whenever pacman's
+    # next_direction changed since the tick before, whatever changed it
+    def __init__(
+        self,
+        game: Game,
+        level: str,
+        pathfinding: Optional[str] = None,
+        every: int = TICK_RATE,
+    ) -> None:
+        if game.ticks:
+            raise ValueError("games can only be recorded from the start")
+        self.game: Game = game
+        self.recording: Recording = Recording(
+            level,
+            level_hash(game.board),
+            pathfinding,
+            0 if game.swarm is None else len(game.swarm),
+            every,
+        )
+        self.recording.checksums.append((0, checksum(game)))
+        self.last: Direction = Direction.NONE
+
+    def __repr__(self) -> str:
+        return "<Recorder recording={0!r}>".format(self.recording)
+
+    def step(self) -> None:
+        game, recording = self.game, self.recording
+        pacman: PacmanSprite = game.get_sprite("pacman")
+        if pacman.next_direction != self.last:
+            self.last = pacman.next_direction
+            recording.inputs.append((game.ticks, self.last))
+        game.step()
+        recording.ticks = game.ticks
+        if game.ticks % recording.every == 0:
+            recording.checksums.append((game.ticks, checksum(game)))
+
+    def save(self, path: str) -> None:
+        # with a checksum of where it finished, wherever that was
+        recording = self.recording
+        if recording.checksums[-1][0] != recording.ticks:
+            recording.checksums.append((recording.ticks, checksum(self.game)))
+        recording.save(path)
+
+
+def replay(
+    recording: Recording,
+    board: Optional[Board] = None,
+    paths: Paths = None,
+) -> Optional[int]:
+    # plays a recording back as fast as it'll go, returning the first tick
+    # where the game doesn't match its checksum or None if it all does.
+    # board is the level and paths what load_paths gives for it, both are
+    # loaded if they're not given. the board itself is left as it is
+    if recording.tick_rate != TICK_RATE:
+        raise ValueError(
+            "recorded at {0} ticks a second rather than {1}".format(
+                recording.tick_rate, TICK_RATE
+            )
+        )
+    if board is None:
+        board = open_level(recording.level)
+    if level_hash(board) != recording.digest:
+        raise ValueError(
+            "'{0}' has changed since it was recorded".format(recording.level)
+        )
+    if paths is None:
+        paths = load_paths(recording.pathfinding, board)
+
+    game = Game(board.copy(), paths, recording.swarm)
+    pacman: PacmanSprite = game.get_sprite("pacman")
+    inputs = dict(recording.inputs)
+    checksums = dict(recording.checksums)
+    if 0 in checksums and checksum(game) != checksums[0]:
+        return 0
+
+    for tick in range(recording.ticks):
+        direction = inputs.get(tick)
+        if direction is not None:
+            pacman.next_direction = direction
+        game.step()
+        game.changed.clear()
+        expected = checksums.get(game.ticks)
+        if expected is not None and checksum(game) != expected:
+            return game.ticks
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="replay",
+        description="play recordings back without a display, checking they still "
+        "go the same way",
+    )
+    parser.add_argument(
+        "recordings", nargs="+", help="recordings, or directories of .rec files"
+    )
+    args = parser.parse_args()
+
+    paths: List[str] = []
+    for path in args.recordings:
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, "*.rec"))))
+        else:
+            paths.append(path)
+
+    # levels and path finding loaded once however many recordings use them
+    levels: Dict[Tuple[str, Optional[str]], Tuple[Board, Paths]] = dict()
+    failures = 0
+    total = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            recording = load_recording(path)
+            key = recording.level, recording.pathfinding
+            if key not in levels:
+                board = open_level(recording.level)
+                levels[key] = board, load_paths(recording.pathfinding, board)
+            tick = replay(recording, *levels[key])
+        except (OSError, ValueError) as error:
+            print("{0}: {1}".format(path, error))
+            failures += 1
+            continue
+        total += recording.ticks
+        if tick is not None:
+            print("{0}: went differently by tick {1}".format(path, tick))
+            failures += 1
+
+    elapsed = time.perf_counter() - start
+    print(
+        "{0} replays, {1} failed, {2} ticks in {3:.2f}s ({4:.0f} ticks/s)".format(
+            len(paths), failures, total, elapsed, total / elapsed if elapsed else 0
+        )
+    )
+    sys.exit(1 if failures else 0)
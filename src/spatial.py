@@ -0,0 +1,46 @@
+from __future__ import annotations
+from typing import Dict, Iterator, List, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from sprite import Sprite
+
+
+class SpatialHash:
+    # sprites bucketed by the tile they're on, kept up to date as they move
+    # so finding what's near something only looks at the tiles around it
+    # rather than at every sprite in the game
+    def __init__(self, size: int = 24) -> None:
+        self.size: int = size
+        self.cells: Dict[Tuple[int, int], List[Sprite]] = dict()
+
+    def __repr__(self) -> str:
+        return "<SpatialHash cells={0} size={1}>".format(len(self.cells), self.size)
+
+    def cell(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return pos[0] // self.size, pos[1] // self.size
+
+    def add(self, sprite: Sprite) -> None:
+        self.cells.setdefault(self.cell(sprite.position), []).append(sprite)
+
+    def move(self, sprite: Sprite, old: Tuple[int, int], new: Tuple[int, int]) -> None:
+        # most moves stay on the same tile, so they don't have to do anything
+        before, after = self.cell(old), self.cell(new)
+        if before != after and self._take(before, sprite):
+            self.cells.setdefault(after, []).append(sprite)
+
+    def _take(self, key: Tuple[int, int], sprite: Sprite) -> bool:
+        # returns whether the sprite was there, it won't have been if it
+        # hasn't been added to the game yet
+        cell = self.cells.get(key)
+        if cell is None or sprite not in cell:
+            return False
+        cell.remove(sprite)
+        if not cell:
+            del self.cells[key]
+        return True
+
+    def within(self, left: int, top: int, right: int, bottom: int) -> Iterator[Sprite]:
+        # everything on the tiles the area touches
+        for ny in range(top // self.size, bottom // self.size + 1):
+            for nx in range(left // self.size, right // self.size + 1):
+                yield from self.cells.get((nx, ny), ())
@@ -1,35 +1,52 @@
 from __future__ import annotations
-import contextlib
-from typing import Tuple
-
-with contextlib.redirect_stdout(None):
-    import pygame
+from typing import Any, Tuple
 
 
 class Sprite:
-    def __init__(
-        self, app, display: pygame.Surface, image: pygame.Surface, pos: Tuple[int, int]
-    ):
-        self.display: pygame.Surface = display
-        display.blit(image, pos)
-        self.image: pygame.Surface = image
+    # slots rather than a dict per sprite since there can be a lot of them
+    # and every one gets moved every tick
+    __slots__ = ("image", "x", "y", "previous", "game")
+
+    def __init__(self, game, image: str, pos: Tuple[int, int]):
+        # image is the name of the asset, whatever's drawing the game looks
+        # it up so that the game itself never has to touch pygame
+        self.image: str = image
 
-        self._position: Tuple[int, int] = pos
-        self.app = app
+        self.x: int = pos[0]
+        self.y: int = pos[1]
+        # where the sprite was before the last tick, for drawing in between
+        self.previous: Tuple[int, int] = pos
+        self.game = game
 
     @property
     def position(self) -> Tuple[int, int]:
-        return self._position
+        return self.x, self.y
+
+    def move(self, image: str, pos: Tuple[int, int]) -> None:
+        x, y = pos
+        size = self.game.space.size
+        # checked here as well as in SpatialHash.move because most moves stay on the
+        # same tile and this is called for every sprite every tick
+        if self.x // size != x // size or self.y // size != y // size:
+            self.game.space.move(self, (self.x, self.y), pos)
+        self.x, self.y = x, y
+        self.image = image
 
-    @property
-    def x(self) -> int:
-        return self._position[0]
+    def update(self) -> None:
+        raise NotImplementedError
 
-    @property
-    def y(self) -> int:
-        return self._position[1]
+    def save(self) -> Tuple[Any, ...]:
+        # everything about the sprite that changes as the game goes on, as
+        # plain values so it can be put back with load() as often as needed
+        return self.image, self.x, self.y, self.previous
 
-    def update(self, image: pygame.Surface, pos: Tuple[int, int]) -> None:
-        self.display.blit(image, self._position)
-        self._position = pos
-        self.image = image
+    def load(self, state: Tuple[Any, ...]) -> None:
+        image, x, y, previous = state
+        self.move(image, (x, y))
+        self.previous = previous
+
+
+def spawn_point(game, name: str) -> Tuple[int, int]:
+    # where the level says the sprite starts, in pixels
+    x, y = game.board.spawns[name]
+    return x * 24, y * 24 + 24
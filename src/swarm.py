@@ -0,0 +1,298 @@
+from __future__ import annotations
+import random
+from typing import List, Optional, TYPE_CHECKING, Tuple
+
+import numpy as np
+
+from board import BITS
+from enums import Direction, GhostMode, Tile
+from ghost import DIRECTIONS, GHOST_SPEED
+from pacman import MAX_STEP, REACH
+from paths import PathTable, UNREACHABLE
+from sprite import spawn_point
+
+if TYPE_CHECKING:
+    from game import Game
+
+KINDS = ("blinky", "pinky", "clyde", "inky")
+BLINKY, PINKY, CLYDE, INKY = range(len(KINDS))
+IMAGES = ("ghost_red", "ghost_pink", "ghost_orange", "ghost_blue")
+
+# directions are stored as their index in ghost.DIRECTIONS, which is also the
+# order ties get broken in, with NONE after them
+NONE = len(DIRECTIONS)
+DX = np.array([0, 0, 1, -1, 0])
+DY = np.array([-1, 1, 0, 0, 0])
+DIRECTION_BITS = np.array([BITS[d] for d in DIRECTIONS] + [0], dtype=np.uint8)
+INVERSE_BITS = np.array([8, 4, 2, 1, 0], dtype=np.uint8)
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(16)])
+HOP_DIRECTIONS = np.full(16, NONE)
+for n, direction in enumerate(DIRECTIONS):
+    HOP_DIRECTIONS[BITS[direction]] = n
+
+
+class GhostSwarm:
+    # any number of ghosts following the same rules as Blinky, Pinky, Clyde
+    # and Inky, but with everything about them kept in arrays so every ghost
+    # is worked out at once each tick. ghost n is KINDS[n % 4], the first four
+    # start where the level says and the rest start on random open tiles
+    def __init__(self, game: Game, count: int, seed: int = 0) -> None:
+        self.game: Game = game
+        board = game.board
+        if game.paths is not None and not isinstance(game.paths, PathTable):
+            raise TypeError("ghost swarms can only path find with a path table")
+
+        self.kinds: np.ndarray = np.arange(count) % len(KINDS)
+        starts: List[Tuple[int, int]] = [
+            spawn_point(game, kind) for kind in KINDS[: min(count, len(KINDS))]
+        ]
+        open_tiles = [
+            (i % board.width, i // board.width)
+            for i, item in enumerate(board.tiles)
+            if item != Tile.WALL.value
+        ]
+        # not right next to pacman if there's anywhere else, since he'd be
+        # caught straight away and then every time he got sent back
+        px, py = board.spawns["pacman"]
+        open_tiles = [
+            (x, y) for x, y in open_tiles if max(abs(x - px), abs(y - py)) > 8
+        ] or open_tiles
+        rng = random.Random(seed)
+        for _ in range(count - len(starts)):
+            x, y = rng.choice(open_tiles)
+            starts.append((x * 24, y * 24 + 24))
+
+        self.start_x: np.ndarray = np.array([x for x, _ in starts], dtype=np.int64)
+        self.start_y: np.ndarray = np.array([y for _, y in starts], dtype=np.int64)
+        self.x: np.ndarray = self.start_x.copy()
+        self.y: np.ndarray = self.start_y.copy()
+        self.previous_x: np.ndarray = self.x.copy()
+        self.previous_y: np.ndarray = self.y.copy()
+        self.directions: np.ndarray = np.full(count, DIRECTIONS.index(Direction.RIGHT))
+        self.modes: np.ndarray = np.full(count, GhostMode.CHASE.value)
+
+        self.table: Optional[PathTable] = game.paths
+        if self.table is not None:
+            self.index = np.asarray(self.table.index, dtype=np.int64)
+            self.distances = np.asarray(self.table.distances)
+            self.hops = np.asarray(self.table.hops)
+            self.count: int = self.table.count
+
+    def __repr__(self) -> str:
+        return "<GhostSwarm ghosts={0}>".format(len(self.kinds))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def reset(self) -> None:
+        self.x[:] = self.start_x
+        self.y[:] = self.start_y
+
+    def save(self) -> Tuple[np.ndarray, ...]:
+        # like Sprite.save, for every ghost at once
+        return tuple(array.copy() for array in self._state())
+
+    def load(self, state: Tuple[np.ndarray, ...]) -> None:
+        for array, saved in zip(self._state(), state):
+            array[:] = saved
+
+    def _state(self) -> Tuple[np.ndarray, ...]:
+        return (
+            self.x,
+            self.y,
+            self.previous_x,
+            self.previous_y,
+            self.directions,
+            self.modes,
+        )
+
+    def step(self) -> None:
+        self.previous_x[:] = self.x
+        self.previous_y[:] = self.y
+        # inky goes off where blinky is, and the single ghosts move one after
+        # the other with blinky first, so everything else goes before inky
+        inky = self.kinds == INKY
+        self._advance(np.flatnonzero(~inky))
+        self._advance(np.flatnonzero(inky))
+
+    def _advance(self, ghosts: np.ndarray) -> None:
+        x, y = self.x[ghosts], self.y[ghosts] - 24
+        turning = ghosts[(x % 24 == 0) & (y % 24 == 0)]
+        if len(turning):
+            self.directions[turning] = self._choose(turning)
+        directions = self.directions[ghosts]
+        self.x[ghosts] += DX[directions] * GHOST_SPEED
+        self.y[ghosts] += DY[directions] * GHOST_SPEED
+
+    def _tile(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        # the walkable index of the tile at x, y in tiles, or of the nearest
+        # one to it for walls and anywhere off the board, like
+        # PathTable._lookup
+        board = self.game.board
+        x = np.clip(x, 0, board.width - 1)
+        y = np.clip(y, 0, board.height - 1)
+        return self.index[y * board.width + x]
+
+    def _choose(self, ghosts: np.ndarray) -> np.ndarray:
+        # Ghost.filter_directions then Ghost.calculate_next_direction
+        board = self.game.board
+        x, y = self.x[ghosts], self.y[ghosts] - 24
+        # looked at fresh every time since the board can be swapped for
+        # another one, or give itself new tiles when it's a copy
+        opens = np.frombuffer(board.open, dtype=np.uint8)
+        masks = opens[(y // 24) * board.width + x // 24]
+        inverse = INVERSE_BITS[self.directions[ghosts]]
+        masks = np.where(POPCOUNT[masks] > 1, masks & ~inverse, masks)
+        allowed = (masks[:, None] & DIRECTION_BITS[None, :4]) != 0
+
+        tx, ty = self._targets(ghosts)
+        chosen = np.full(len(ghosts), -1)
+        if self.table is not None:
+            chosen = self._path_find(x // 24, y // 24, tx // 24, ty // 24, allowed)
+
+        # whatever path finding didn't sort out heads for the target in a
+        # straight line, going with the first of the closest
+        nx = x[:, None] + DX[None, :4] * GHOST_SPEED
+        ny = y[:, None] + DY[None, :4] * GHOST_SPEED
+        distances = (nx - tx[:, None]) ** 2 + (ny - ty[:, None]) ** 2
+        distances = np.where(allowed, distances, np.iinfo(np.int64).max)
+        straight = np.argmin(distances, axis=1)
+        chosen = np.where(chosen < 0, straight, chosen)
+        return np.where(allowed.any(axis=1), chosen, NONE)
+
+    def _path_find(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        tx: np.ndarray,
+        ty: np.ndarray,
+        allowed: np.ndarray,
+    ) -> np.ndarray:
+        # PathTable.best, -1 where it would have given up
+        count = self.count
+        start, target = self._tile(x, y), self._tile(tx, ty)
+
+        hops = HOP_DIRECTIONS[self.hops[start * count + target]]
+        hop_allowed = hops < NONE
+        hop_allowed[hop_allowed] = allowed[hop_allowed, hops[hop_allowed]]
+
+        # the best of the rest when the shortest way is back where it came
+        distances = np.full(allowed.shape, UNREACHABLE, dtype=np.int64)
+        for n in range(4):
+            neighbours = self._tile(x + DX[n], y + DY[n])
+            usable = allowed[:, n]
+            pair = np.where(usable, neighbours * count + target, 0)
+            distances[:, n] = np.where(usable, self.distances[pair], UNREACHABLE)
+        best = np.argmin(distances, axis=1)
+        reachable = distances[np.arange(len(best)), best] < UNREACHABLE
+
+        chosen = np.where(reachable, best, -1)
+        return np.where(hop_allowed, hops, chosen)
+
+    def _targets(self, ghosts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # the find_target of each kind of ghost, in the same board pixels
+        game = self.game
+        pacman = game.get_sprite("pacman")
+        px, py = pacman.x, pacman.y - 24
+        direction = NONE
+        if pacman.current_direction in DIRECTIONS:
+            direction = DIRECTIONS.index(pacman.current_direction)
+        kinds = self.kinds[ghosts]
+        scatter = self.modes[ghosts] == GhostMode.SCATTER.value
+        start_x, start_y = self.start_x[ghosts], self.start_y[ghosts] - 24
+        tx = np.full(len(ghosts), px)
+        ty = np.full(len(ghosts), py)
+
+        blinky = kinds == BLINKY
+        tx[blinky & scatter] = (game.board.width - 1) * 24
+        ty[blinky & scatter] = 24
+
+        # pinky aims for 4 tiles in front of pacman
+        pinky = kinds == PINKY
+        ahead_x = (px // 24 + DX[direction] * 4) * 24
+        ahead_y = (py // 24 + DY[direction] * 4) * 24
+        tx[pinky] = np.where(scatter[pinky], start_x[pinky], ahead_x)
+        ty[pinky] = np.where(scatter[pinky], start_y[pinky], ahead_y)
+
+        # clyde heads home whenever he gets within 8 tiles of pacman
+        clyde = kinds == CLYDE
+        if clyde.any():
+            cx = self.x[ghosts][clyde] // 24
+            cy = (self.y[ghosts][clyde] - 24) // 24
+            tile_x, tile_y = px // 24, py // 24
+            distances = np.maximum(np.abs(cx - tile_x), np.abs(cy - tile_y))
+            if self.table is not None:
+                start = self._tile(cx, cy)
+                target = self._tile(np.array(tile_x), np.array(tile_y))
+                paths = self.distances[start * self.count + target]
+                distances = np.where(paths != UNREACHABLE, paths, distances)
+            home = distances <= 8
+            tx[clyde] = np.where(home, start_x[clyde], px)
+            ty[clyde] = np.where(home, start_y[clyde], py)
+
+        # inky doubles the line from blinky to 2 tiles in front of pacman
+        inky = kinds == INKY
+        if inky.any():
+            blinkies = np.flatnonzero(self.kinds == BLINKY)
+            bx, by = px, py
+            if len(blinkies):
+                bx, by = self.x[blinkies[0]], self.y[blinkies[0]] - 24
+            ax = px + DX[direction] * 48
+            ay = py + DY[direction] * 48
+            tx[inky] = ax + (ax - bx)
+            ty[inky] = ay + (ay - by)
+        return tx, ty
+
+    def visible(
+        self, alpha: float, rect: Tuple[int, int, int, int]
+    ) -> List[Tuple[str, int, int]]:
+        # the image and position of every ghost inside rect, in between
+        # ticks the same way render.interpolate does it
+        dx, dy = self.x - self.previous_x, self.y - self.previous_y
+        sliding = (np.abs(dx) <= MAX_STEP) & (np.abs(dy) <= MAX_STEP)
+        x = np.where(sliding, np.round(self.previous_x + dx * alpha), self.x)
+        y = np.where(sliding, np.round(self.previous_y + dy * alpha), self.y)
+
+        left, top, width, height = rect
+        shown = np.flatnonzero(
+            (x < left + width) & (left < x + 24) & (y < top + height) & (top < y + 24)
+        )
+        return [
+            (IMAGES[kind], int(x), int(y))
+            for kind, x, y in zip(self.kinds[shown], x[shown], y[shown])
+        ]
+
+    def touching(self, start: Tuple[int, int], end: Tuple[int, int]) -> bool:
+        # pacman.swept_overlap against every ghost at once, after throwing
+        # out the ones that are too far away to have got near him
+        reach = MAX_STEP + REACH
+        x, y = self.x, self.y
+        near = np.flatnonzero(
+            (x >= min(start[0], end[0]) - reach)
+            & (x <= max(start[0], end[0]) + reach)
+            & (y >= min(start[1], end[1]) - reach)
+            & (y <= max(start[1], end[1]) + reach)
+        )
+        if not len(near):
+            return False
+
+        x, y = x[near], y[near]
+        before_x, before_y = self.previous_x[near], self.previous_y[near]
+        jumped = np.maximum(np.abs(x - before_x), np.abs(y - before_y)) > MAX_STEP
+        before_x = np.where(jumped, x, before_x)
+        before_y = np.where(jumped, y, before_y)
+
+        low = np.full(len(near), -np.inf)
+        high = np.full(len(near), np.inf)
+        close = np.ones(len(near), dtype=bool)
+        for axis, b0, b1 in ((0, before_x, x), (1, before_y, y)):
+            offset = start[axis] - b0
+            change = (end[axis] - start[axis]) - (b1 - b0)
+            still = change == 0
+            close &= ~still | (np.abs(offset) < REACH)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                first = (-REACH - offset) / change
+                second = (REACH - offset) / change
+            low = np.where(still, low, np.maximum(low, np.minimum(first, second)))
+            high = np.where(still, high, np.minimum(high, np.maximum(first, second)))
+        return bool(np.any(close & (low < high) & (low < 1) & (high > 0)))
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import contextlib
+from typing import Tuple
+
+with contextlib.redirect_stdout(None):
+    import pygame
+
+from lru import LRU
+
+Colour = Tuple[int, int, int]
+
+
+class TextCache:
+    def __init__(self, size: int = 32) -> None:
+        # (font, text, colour) -> the rendered surface
+        self.surfaces: LRU[Tuple[pygame.font.Font, str, Colour], pygame.Surface]
+        self.surfaces = LRU(size)
+
+    def __repr__(self) -> str:
+        return "<TextCache cached={0} size={1}>".format(
+            len(self.surfaces), self.surfaces.size
+        )
+
+    def render(
+        self, font: pygame.font.Font, text: str, colour: Colour
+    ) -> pygame.Surface:
+        return self.surfaces.fetch(
+            (font, text, colour), lambda key: font.render(text, True, colour)
+        )